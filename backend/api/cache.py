@@ -0,0 +1,148 @@
+from collections import namedtuple
+from hashlib import md5
+
+from django.core.cache import cache
+
+from recipes.constants import (
+    AUTHORS_VERSION,
+    POPULARITY_VERSION,
+    RECIPE_VERSION,
+    RECIPES_CACHE_TIMEOUT,
+    RECIPES_VERSION,
+    SHOPPING_LIST_CACHE_MAX_SIZE,
+    USER_FLAGS_VERSION,
+)
+from recipes.models import Favorite, Follow, ShoppingCard
+from recipes.registry import ingredients, tags
+from recipes.versions import get_version
+
+
+def reference_versions():
+    return (tags.version, ingredients.version, get_version(AUTHORS_VERSION))
+
+
+USER_DEPENDENT_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+
+UserFlags = namedtuple('UserFlags', ('favorites', 'cart', 'following'))
+NO_FLAGS = UserFlags(frozenset(), frozenset(), frozenset())
+
+
+def get_user_flags(user):
+    """
+    Id избранных рецептов, рецептов в списке покупок и авторов в подписках.
+
+    Наборы кэшируются по версии пользователя, которая сдвигается при
+    каждом изменении его избранного, списка покупок или подписок.
+    """
+    if not user.is_authenticated:
+        return NO_FLAGS
+    flags = getattr(user, 'recipe_flags', None)
+    if flags is not None:
+        return flags
+    key = 'user_flags:{}:{}'.format(
+        user.pk, get_version(USER_FLAGS_VERSION.format(user.pk))
+    )
+    flags = cache.get(key)
+    if flags is None:
+        flags = UserFlags(*(
+            frozenset(
+                model.objects.filter(user=user).values_list(field, flat=True)
+            )
+            for model, field in (
+                (Favorite, 'recipe_id'),
+                (ShoppingCard, 'recipe_id'),
+                (Follow, 'following_id'),
+            )
+        ))
+        cache.set(key, flags, RECIPES_CACHE_TIMEOUT)
+    user.recipe_flags = flags
+    return flags
+
+
+def overlay_user_flags(recipes, flags):
+    """Проставляет флаги пользователя в общие для всех данные рецептов."""
+    for recipe in recipes:
+        if 'is_favorited' in recipe:
+            recipe['is_favorited'] = recipe['id'] in flags.favorites
+        if 'is_in_shopping_cart' in recipe:
+            recipe['is_in_shopping_cart'] = recipe['id'] in flags.cart
+        if 'author' in recipe:
+            recipe['author']['is_subscribed'] = (
+                recipe['author']['id'] in flags.following
+            )
+    return recipes
+
+
+def recipe_list_cache_key(request, kind='list'):
+    """Ключ списка рецептов: поколения данных и нормализованные параметры."""
+    params = sorted(
+        (name, sorted(values))
+        for name, values in request.query_params.lists()
+    )
+    owner = None
+    if (request.user.is_authenticated and any(
+            param in request.query_params for param in USER_DEPENDENT_PARAMS
+    )):
+        owner = (
+            request.user.pk,
+            get_version(USER_FLAGS_VERSION.format(request.user.pk)),
+        )
+    # Популярность меняется с каждым избранным, поэтому её поколение
+    # сдвигает только списки, отсортированные по ней.
+    popularity = None
+    if request.query_params.get('ordering') == 'popular':
+        popularity = get_version(POPULARITY_VERSION)
+    digest = md5(
+        repr((request.get_host(), params, owner, popularity)).encode()
+    ).hexdigest()
+    return 'recipes:{}:{}:{}:{}:{}:{}'.format(
+        kind, get_version(RECIPES_VERSION), *reference_versions(), digest
+    )
+
+
+def recipe_detail_cache_key(pk, fields=None):
+    return 'recipes:detail:{}:{}:{}:{}:{}:{}'.format(
+        pk, get_version(RECIPE_VERSION.format(pk)), *reference_versions(),
+        '*' if fields is None else ','.join(fields)
+    )
+
+
+def cached_data(key, producer):
+    """Данные ответа из кэша или от `producer`, с сохранением в кэш."""
+    data = cache.get(key)
+    if data is None:
+        data = producer()
+        cache.set(key, data, RECIPES_CACHE_TIMEOUT)
+    return data
+
+
+def shopping_list_cache_key(user, file_format):
+    """Ключ файла списка покупок: меняется вместе со списком пользователя."""
+    return 'shopping_list:{}:{}:{}:{}:{}'.format(
+        user.pk,
+        get_version(USER_FLAGS_VERSION.format(user.pk)),
+        get_version(RECIPES_VERSION),
+        ingredients.version,
+        file_format,
+    )
+
+
+def cached_stream(key, chunks, max_size=SHOPPING_LIST_CACHE_MAX_SIZE):
+    """
+    Отдаёт части ответа и сохраняет их в кэш, когда поток закончится.
+
+    Ответы больше `max_size` байт не кэшируются и не копятся в памяти.
+    """
+    buffer, size = [], 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        if buffer is not None:
+            size += len(chunk)
+            if size <= max_size:
+                buffer.append(chunk)
+            else:
+                buffer = None
+        yield chunk
+    if buffer is not None:
+        cache.set(key, b''.join(buffer), RECIPES_CACHE_TIMEOUT)
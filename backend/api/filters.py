@@ -1,35 +1,196 @@
+from django import forms
+from django.db.models import (
+    Count,
+    Exists,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+)
+from django.db.models.functions import Cast
 from django_filters import FilterSet
 from django_filters.filters import (
+    BaseInFilter,
     BooleanFilter,
     CharFilter,
-    ModelMultipleChoiceFilter,
+    ChoiceFilter,
+    MultipleChoiceFilter,
+    NumberFilter,
 )
 from django_filters.widgets import BooleanWidget
 
-from recipes.models import Recipe, Tag, Ingredient
+from api.cache import get_user_flags
+from recipes import registry
+from recipes.constants import COOKING_TIME_BUCKETS, RECIPE_ORDERINGS
+from recipes.models import Recipe, Ingredient, RecipeIngredient
+from recipes.search import search_recipes
+
+TAGS_MODE_ANY = 'any'
+TAGS_MODE_ALL = 'all'
+TAGS_MODES = (
+    (TAGS_MODE_ANY, 'Хотя бы один из тегов'),
+    (TAGS_MODE_ALL, 'Все теги'),
+)
+ORDERINGS = (
+    ('popular', 'Популярные'),
+    ('trending', 'В тренде'),
+)
+
+
+class IntegerInFilter(BaseInFilter, NumberFilter):
+    field_class = forms.IntegerField
+
+
+def tag_choices():
+    return [(tag.slug, tag.name) for tag in registry.tags.all()]
 
 
 class RecipeFilter(FilterSet):
     is_favorited = BooleanFilter(
-        field_name="is_favorited",
+        method='filter_user_flag',
         label='is_favorited',
         widget=BooleanWidget()
     )
     is_in_shopping_cart = BooleanFilter(
-        field_name="is_in_shopping_cart",
+        method='filter_user_flag',
         label='is_in_shopping_cart',
         widget=BooleanWidget()
     )
-    tags = ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        queryset=Tag.objects.all(),
-        to_field_name='slug',
-        conjoined=False,
+    tags = MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
+    )
+    tags_mode = ChoiceFilter(
+        choices=TAGS_MODES,
+        method='filter_tags_mode',
+    )
+    search = CharFilter(method='filter_search')
+    have = IntegerInFilter(method='filter_have')
+    exclude = IntegerInFilter(method='filter_exclude')
+    cooking_time_min = NumberFilter(
+        field_name='cooking_time', lookup_expr='gte'
+    )
+    cooking_time_max = NumberFilter(
+        field_name='cooking_time', lookup_expr='lte'
     )
+    ordering = ChoiceFilter(choices=ORDERINGS, method='filter_ordering')
 
     class Meta:
         model = Recipe
-        fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags')
+        fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags',
+                  'tags_mode', 'search', 'have', 'exclude',
+                  'cooking_time_min', 'cooking_time_max', 'ordering')
+
+    def filter_tags(self, queryset, name, value):
+        """
+        Полусоединение со связующей таблицей вместо JOIN и DISTINCT.
+
+        В режиме `any` рецепт подходит, если у него есть хотя бы один из
+        тегов, в режиме `all` — если есть все.
+        """
+        tag_ids = [
+            tag.pk for tag in registry.tags.all() if tag.slug in value
+        ]
+        links = Recipe.tags.through.objects.filter(recipe_id=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_mode') == TAGS_MODE_ALL:
+            for tag_id in tag_ids:
+                queryset = queryset.filter(Exists(links.filter(tag_id=tag_id)))
+            return queryset
+        return queryset.filter(Exists(links.filter(tag_id__in=tag_ids)))
+
+    def filter_tags_mode(self, queryset, name, value):
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_have(self, queryset, name, value):
+        """
+        Рецепты с ингредиентами из `have`, по убыванию доли их
+        ингредиентов, которые уже есть.
+
+        Кандидаты выбираются полусоединением по индексу ингредиента,
+        доли считаются только для них подзапросами по уникальному индексу
+        (рецепт, ингредиент).
+        """
+        links = RecipeIngredient.objects.filter(
+            recipe_id=OuterRef('pk')
+        ).order_by().values('recipe_id')
+
+        def count(links):
+            return Cast(
+                Subquery(links.annotate(count=Count('pk')).values('count')),
+                FloatField(),
+            )
+
+        return queryset.filter(pk__in=RecipeIngredient.objects.filter(
+            ingredient_id__in=value
+        ).values('recipe_id')).annotate(
+            pantry_score=count(links.filter(ingredient_id__in=value))
+            / count(links)
+        ).order_by('-pantry_score', '-pub_date', '-id')
+
+    def filter_exclude(self, queryset, name, value):
+        return queryset.exclude(Exists(RecipeIngredient.objects.filter(
+            recipe_id=OuterRef('pk'), ingredient_id__in=value
+        )))
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
+    def filter_user_flag(self, queryset, name, value):
+        flags = get_user_flags(self.request.user)
+        recipe_ids = (flags.favorites if name == 'is_favorited'
+                      else flags.cart)
+        if value:
+            return queryset.filter(pk__in=recipe_ids)
+        return queryset.exclude(pk__in=recipe_ids)
+
+
+def cooking_time_buckets():
+    """Интервалы гистограммы времени приготовления: (от, до)."""
+    bounds = (0, *COOKING_TIME_BUCKETS, None)
+    return list(zip(bounds, bounds[1:]))
+
+
+def recipe_facets(queryset):
+    """
+    Число рецептов по каждому тегу и гистограмма времени приготовления.
+
+    Все счётчики считаются одним запросом условной агрегации.
+    """
+    links = Recipe.tags.through.objects.filter(recipe_id=OuterRef('pk'))
+    tag_list = registry.tags.all()
+    buckets = cooking_time_buckets()
+    counts = {
+        'count': Count('pk'),
+        **{
+            f'tag_{tag.pk}': Count(
+                'pk', filter=Q(Exists(links.filter(tag_id=tag.pk)))
+            )
+            for tag in tag_list
+        },
+        **{
+            f'time_{index}': Count('pk', filter=Q(
+                cooking_time__gte=low,
+                **({} if high is None else {'cooking_time__lt': high})
+            ))
+            for index, (low, high) in enumerate(buckets)
+        },
+    }
+    result = queryset.order_by().aggregate(**counts)
+    return {
+        'count': result['count'],
+        'tags': [
+            {'id': tag.pk, 'name': tag.name, 'slug': tag.slug,
+             'count': result[f'tag_{tag.pk}']}
+            for tag in tag_list
+        ],
+        'cooking_time': [
+            {'min': low, 'max': high, 'count': result[f'time_{index}']}
+            for index, (low, high) in enumerate(buckets)
+        ],
+    }
 
 
 class IngredientFilter(FilterSet):
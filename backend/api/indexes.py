@@ -0,0 +1,141 @@
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from threading import Lock
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+
+from recipes.constants import (
+    INGREDIENT_SEARCH_LIMIT,
+    TRIGRAM_SIMILARITY_THRESHOLD,
+)
+from recipes.models import Ingredient
+from recipes.registry import ingredients
+
+PREFIX_UPPER_BOUND = '\U0010ffff'
+WORD_RE = re.compile(r'\w+')
+
+
+def trigrams(value):
+    """Множество триграмм строки по правилам pg_trgm."""
+    result = set()
+    for word in WORD_RE.findall(value.casefold()):
+        word = f'  {word} '
+        result.update(word[i:i + 3] for i in range(len(word) - 2))
+    return result
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Хранит строки таблицы, отсортированные по названию в нижнем регистре,
+    и триграммный индекс названий. Перестраивается вместе с реестром
+    ингредиентов.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._data = ([], [], {}, [])
+
+    def _build(self):
+        rows = sorted(
+            (
+                {
+                    'id': ingredient.id,
+                    'name': ingredient.name,
+                    'measurement_unit': ingredient.measurement_unit,
+                }
+                for ingredient in ingredients.all()
+            ),
+            key=lambda row: (row['name'].casefold(), row['id'])
+        )
+        postings = defaultdict(list)
+        sizes = []
+        for position, row in enumerate(rows):
+            row_trigrams = trigrams(row['name'])
+            sizes.append(len(row_trigrams))
+            for trigram in row_trigrams:
+                postings[trigram].append(position)
+        self._data = (
+            [row['name'].casefold() for row in rows],
+            rows,
+            dict(postings),
+            sizes,
+        )
+
+    def _ensure_fresh(self):
+        version = ingredients.version
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._build()
+                self._version = version
+
+    def startswith(self, prefix):
+        """Ингредиенты, название которых начинается с `prefix`."""
+        self._ensure_fresh()
+        keys, rows, _, _ = self._data
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + PREFIX_UPPER_BOUND, start)
+        return rows[start:end]
+
+    def similar(self, query, limit, exclude=()):
+        """Ингредиенты, похожие на `query` по триграммам, лучшие первыми."""
+        self._ensure_fresh()
+        _, rows, postings, sizes = self._data
+        query_trigrams = trigrams(query)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(postings.get(trigram, ()))
+        scored = []
+        for position, count in shared.items():
+            similarity = count / (
+                len(query_trigrams) + sizes[position] - count
+            )
+            if (similarity >= TRIGRAM_SIMILARITY_THRESHOLD
+                    and rows[position]['id'] not in exclude):
+                scored.append((-similarity, position))
+        scored.sort()
+        return [rows[position] for _, position in scored[:limit]]
+
+
+ingredient_index = IngredientIndex()
+
+
+def similar_ingredients(query, limit, exclude=()):
+    if connection.vendor != 'postgresql':
+        return ingredient_index.similar(query, limit, exclude)
+    return list(
+        Ingredient.objects.annotate(
+            similarity=TrigramSimilarity('name', query)
+        ).filter(
+            name__trigram_similar=query
+        ).exclude(
+            id__in=exclude
+        ).order_by(
+            '-similarity', 'name'
+        ).values('id', 'name', 'measurement_unit')[:limit]
+    )
+
+
+def search_ingredients(query, limit=INGREDIENT_SEARCH_LIMIT):
+    """
+    Нечёткий поиск ингредиентов.
+
+    Сначала идут совпадения по началу названия, затем похожие названия:
+    через индекс pg_trgm на PostgreSQL и через индекс в памяти на
+    остальных СУБД.
+    """
+    rows = ingredient_index.startswith(query)[:limit]
+    if len(rows) < limit:
+        rows += similar_ingredients(
+            query,
+            limit - len(rows),
+            exclude={row['id'] for row in rows},
+        )
+    return rows
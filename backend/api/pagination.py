@@ -0,0 +1,125 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.constants import FEED_ORDERING
+from recipes.feed import feed_page
+from recipes.models import Recipe
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Пагинация limit/offset с курсорным режимом по запросу.
+
+    Если в запросе есть параметр `cursor` (для первой страницы — пустой),
+    страница выбирается по ключу `view.keyset_ordering` без OFFSET и без
+    подсчёта общего количества объектов.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (
+            self.cursor_query_param in request.query_params
+            and getattr(view, 'keyset_ordering', None) is not None
+        )
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request) or self.default_limit
+        self.ordering = view.keyset_ordering
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+        return self.cut_page(list(queryset[:self.limit + 1]))
+
+    def cut_page(self, page):
+        """Страница из `limit + 1` строк: лишняя говорит о следующей."""
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+        last = page[-1] if page else None
+        self.next_position = page and [
+            last[field.lstrip('-')] if isinstance(last, dict)
+            else getattr(last, field.lstrip('-'))
+            for field in self.ordering
+        ]
+        return page
+
+    def get_keyset_filter(self, position):
+        """(a, b) > (x, y) в виде OR-цепочки, понятной любой СУБД."""
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): value for previous, value
+                in zip(self.ordering[:index], position[:index])
+            }
+            conditions.append(
+                Q(**equal, **{f'{name}__{lookup}': position[index]})
+            )
+        return reduce(or_, conditions)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (BinasciiError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        return urlsafe_b64encode(
+            json.dumps(position, default=str).encode()
+        ).decode()
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class FeedPagination(KeysetPagination):
+    """Курсорная пагинация ленты подписок, собираемой `feed_page`."""
+
+    def paginate_feed(self, user, request):
+        self.use_cursor = True
+        self.request = request
+        self.limit = self.get_limit(request) or self.default_limit
+        self.ordering = FEED_ORDERING
+        position = self.decode_cursor(request, Recipe)
+        return self.cut_page(feed_page(user, self.limit + 1, position))
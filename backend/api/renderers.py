@@ -0,0 +1,146 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen import canvas
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import BaseRenderer
+
+SHOPPING_LIST_TITLE = 'Ваш список покупок:'
+SHOPPING_LIST_HEADER = ('name', 'amount', 'measurement_unit')
+PDF_FONT_NAME = 'ShoppingList'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+
+
+class ShoppingListUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Список покупок в этом формате сейчас недоступен.'
+    default_code = 'shopping_list_unavailable'
+
+
+class ShoppingListRenderer(BaseRenderer, ABC):
+    """
+    Формат выгрузки списка покупок.
+
+    Выбирается обычным согласованием содержимого DRF (заголовок Accept
+    или `?format=`); `export` отдаёт файл частями по строкам агрегата
+    (название, количество, единица измерения). Ответы с ошибками эти
+    форматы не рисуют: представление отдаёт их в JSON.
+
+    Форматы без `streaming` собираются целиком до ответа, чтобы ошибка
+    сборки стала ответом с ошибкой, а не оборванным файлом.
+    """
+
+    charset = 'utf-8'
+    extension = None
+    streaming = True
+
+    @property
+    def filename(self):
+        return f'shoppinglist.{self.extension}'
+
+    @abstractmethod
+    def export(self, rows):
+        """Части файла по строкам агрегата."""
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    extension = 'txt'
+
+    def export(self, rows):
+        yield f'{SHOPPING_LIST_TITLE}\n'
+        for name, amount, measurement_unit in rows:
+            yield f'{name}: {amount} {measurement_unit}\n'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    extension = 'csv'
+
+    def export(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(SHOPPING_LIST_HEADER)
+        for row in rows:
+            yield writer.writerow(row)
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    extension = 'json'
+
+    def export(self, rows):
+        separator = '['
+        for row in rows:
+            yield separator + json.dumps(
+                dict(zip(SHOPPING_LIST_HEADER, row)), ensure_ascii=False
+            )
+            separator = ','
+        yield ']' if separator == ',' else '[]'
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    """PDF собирается целиком: формат не позволяет отдавать его частями."""
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    extension = 'pdf'
+    charset = None
+    streaming = False
+
+    @staticmethod
+    def register_font():
+        if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+            return
+        try:
+            font = TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_FONT)
+        except (OSError, TTFError):
+            raise ShoppingListUnavailable(
+                'Не найден шрифт для PDF-списка покупок.'
+            )
+        pdfmetrics.registerFont(font)
+
+    def export(self, rows):
+        self.register_font()
+        buffer = BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        _, height = A4
+        lines = (
+            SHOPPING_LIST_TITLE,
+            *(f'{name}: {amount} {unit}' for name, amount, unit in rows),
+        )
+        top = height - PDF_MARGIN
+        y = top
+        pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+        for line in lines:
+            if y < PDF_MARGIN:
+                pdf.showPage()
+                pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+                y = top
+            pdf.drawString(PDF_MARGIN, y, line)
+            y -= PDF_FONT_SIZE * 1.5
+        pdf.save()
+        yield buffer.getvalue()
+
+
+SHOPPING_LIST_RENDERERS = (
+    TextShoppingListRenderer,
+    CSVShoppingListRenderer,
+    JSONShoppingListRenderer,
+    PDFShoppingListRenderer,
+)
@@ -1,20 +1,29 @@
-from django.db.utils import IntegrityError
+from django.db import transaction
+from django.db.models import Manager
 from django.contrib.auth.password_validation import validate_password
 from rest_framework.serializers import (
+    ListSerializer,
     Serializer,
     ModelSerializer,
     CurrentUserDefault,
     ValidationError,
     SerializerMethodField,
     HiddenField,
+    PrimaryKeyRelatedField,
     ReadOnlyField,
     IntegerField,
     BooleanField,
     CharField,
+    ListField,
 )
 from rest_framework.validators import UniqueTogetherValidator
 from drf_base64.fields import Base64ImageField
 
+from recipes.constants import (
+    BATCH_MAX_SIZE,
+    RECIPE_FIELDS,
+    SHORT_RECIPE_FIELDS,
+)
 from recipes.models import (
     Tag,
     Ingredient,
@@ -25,6 +34,9 @@ from recipes.models import (
     RecipeIngredient,
     User,
 )
+from recipes import registry
+from recipes.carts import recipe_amounts, recipe_ingredients_changed
+from recipes.registry import ingredients, prefetch_tags
 from api.utils import (
     CurrentRecipeDefault,
     CurrentFollowingUserDefault,
@@ -39,7 +51,7 @@ class TagSerializer(ModelSerializer):
         read_only_fields = ('id', 'name', 'color', 'slug')
 
 
-class UserBaseSerializer(ModelSerializer):
+class UserBaseSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name',
@@ -102,6 +114,12 @@ class RecipeIngredientSerializer(ModelSerializer):
         model = RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
+    def to_representation(self, instance):
+        ingredient = ingredients.get(instance.ingredient_id)
+        if ingredient is not None:
+            instance.ingredient = ingredient
+        return super().to_representation(instance)
+
 
 class ChooseRecipeIngredientSerializer(ModelSerializer):
     id = IntegerField(source='ingredient.id')
@@ -112,6 +130,14 @@ class ChooseRecipeIngredientSerializer(ModelSerializer):
         fields = ('id', 'amount')
 
 
+class RecipeListSerializer(ListSerializer):
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        if 'tags' in self.child.fields:
+            prefetch_tags(recipes)
+        return super().to_representation(recipes)
+
+
 class RecipeSerializer(DynamicFieldsModelSerializer):
     is_favorited = BooleanField(read_only=True)
     is_in_shopping_cart = BooleanField(read_only=True)
@@ -120,12 +146,18 @@ class RecipeSerializer(DynamicFieldsModelSerializer):
         many=True,
     )
     image = SerializerMethodField('get_image_url')
-    tags = TagSerializer(many=True)
+    tags = TagSerializer(many=True, source='registry_tags')
     author = UserSerializer()
 
     class Meta:
         model = Recipe
-        exclude = ('pub_date',)
+        fields = RECIPE_FIELDS
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        if 'tags' in self.fields:
+            prefetch_tags([instance])
+        return super().to_representation(instance)
 
     def get_image_url(self, obj):
         if obj.image:
@@ -133,11 +165,25 @@ class RecipeSerializer(DynamicFieldsModelSerializer):
         return None
 
 
+class RegistryTagField(PrimaryKeyRelatedField):
+    """Тег по id из реестра, без запроса к БД на каждый тег."""
+
+    def to_internal_value(self, data):
+        try:
+            tag = registry.tags.get(int(data))
+        except (TypeError, ValueError):
+            tag = None
+        if tag is None:
+            return super().to_internal_value(data)
+        return tag
+
+
 class CreateRecipeSerializer(ModelSerializer):
     ingredients = ChooseRecipeIngredientSerializer(
         many=True,
         source='recipeingredient_set',
     )
+    tags = RegistryTagField(queryset=Tag.objects.all(), many=True)
     image = Base64ImageField()
 
     class Meta:
@@ -172,25 +218,25 @@ class CreateRecipeSerializer(ModelSerializer):
         return value
 
     def create_recipeingredients(self, ingredients, recipe):
-        try:
-            RecipeIngredient.objects.bulk_create(
-                [RecipeIngredient(
-                    ingredient=Ingredient.objects.get(
-                        **ingredient['ingredient']
-                    ),
-                    recipe=recipe,
-                    amount=ingredient['amount']
-                ) for ingredient in ingredients]
-            )
-        except IntegrityError:
+        ingredient_ids = [item['ingredient']['id'] for item in ingredients]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
             raise ValidationError({
                 'ingredients': 'Ингридиенты не могут повторяться!'
             })
-        except Ingredient.DoesNotExist:
+        found = Ingredient.objects.in_bulk(ingredient_ids)
+        if len(found) != len(ingredient_ids):
             raise ValidationError({
                 'ingredients': 'Неопознанный ингредиент!'
             })
-
+        RecipeIngredient.objects.bulk_create(
+            [RecipeIngredient(
+                ingredient=found[ingredient['ingredient']['id']],
+                recipe=recipe,
+                amount=ingredient['amount']
+            ) for ingredient in ingredients]
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('recipeingredient_set')
 
@@ -200,11 +246,14 @@ class CreateRecipeSerializer(ModelSerializer):
         self.create_recipeingredients(ingredients_data, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('recipeingredient_set')
+        old_amounts = recipe_amounts(instance.pk)
         instance = super().update(instance, validated_data)
         instance.ingredients.clear()
         self.create_recipeingredients(ingredients_data, instance)
+        recipe_ingredients_changed(instance.pk, old_amounts)
         instance.save()
         return instance
 
@@ -221,14 +270,14 @@ class ShoppingCardSerializer(Serializer):
             ),
         ]
 
+    @transaction.atomic
     def create(self, validated_data):
         return ShoppingCard.objects.create(**validated_data)
 
     def to_representation(self, instance):
         recipe = (instance.recipe if isinstance(instance, ShoppingCard)
                   else instance['recipe'])
-        fields = ('id', 'name', 'image', 'cooking_time')
-        return RecipeSerializer(recipe, fields=fields).data
+        return RecipeSerializer(recipe, fields=SHORT_RECIPE_FIELDS).data
 
 
 class FavoriteSerializer(ShoppingCardSerializer):
@@ -241,14 +290,22 @@ class FavoriteSerializer(ShoppingCardSerializer):
             ),
         ]
 
+    @transaction.atomic
     def create(self, validated_data):
         return Favorite.objects.create(**validated_data)
 
     def to_representation(self, instance):
         recipe = (instance.recipe if isinstance(instance, Favorite)
                   else instance['recipe'])
-        fields = ('id', 'name', 'image', 'cooking_time')
-        return RecipeSerializer(recipe, fields=fields).data
+        return RecipeSerializer(recipe, fields=SHORT_RECIPE_FIELDS).data
+
+
+class BatchSerializer(Serializer):
+    ids = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BATCH_MAX_SIZE,
+    )
 
 
 class FollowSerializer(UserSerializer):
@@ -260,14 +317,19 @@ class FollowSerializer(UserSerializer):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_recipes(self, obj):
+        cards = getattr(obj, 'recipe_cards', None)
+        if cards is not None:
+            return RecipeSerializer(
+                cards, fields=SHORT_RECIPE_FIELDS, many=True
+            ).data
         recipes_qs = obj.recipes.all()
-        recipes_limit = (self.context['request']
-                             .query_params.get('recipes_limit'))
+        # Лимит проверяет представление (UserViewSet.get_recipes_limit).
+        recipes_limit = self.context.get('recipes_limit')
         if recipes_limit is not None:
-            recipes_qs = recipes_qs[:int(recipes_limit)]
+            recipes_qs = recipes_qs[:recipes_limit]
         return RecipeSerializer(
             recipes_qs,
-            fields=('id', 'name', 'image', 'cooking_time'),
+            fields=SHORT_RECIPE_FIELDS,
             many=True
         ).data
 
@@ -292,6 +354,7 @@ class CreateFollowSerializer(Serializer):
             )
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         return Follow.objects.create(**validated_data)
 
@@ -1,9 +1,19 @@
+from hashlib import md5
+
+from django.core.exceptions import FieldDoesNotExist
 from django.shortcuts import get_object_or_404
-from django.db.models import Exists, OuterRef, Value
-from django.http import HttpResponse
+from django.db.models import Exists, F, OuterRef, Value, Window
+from django.db.models.functions import RowNumber
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from rest_framework.serializers import ModelSerializer, ValidationError
 
 
+from api.cache import cached_stream, shopping_list_cache_key
+from recipes.constants import SHORT_RECIPE_FIELDS
+from recipes.units import normalize_shopping_list
 from recipes.models import (
     Recipe,
     Follow,
@@ -76,31 +86,174 @@ class AnnotateMixin:
         return queryset
 
 
+class ConditionalGetMixin:
+    """
+    Валидаторы ETag/Last-Modified и ответ 304 для GET-запросов.
+
+    ETag строится из `get_etag_parts` — дешёвого описания состояния
+    ресурса, без сериализации тела ответа.
+    """
+
+    def get_etag_parts(self, request, *args, **kwargs):
+        return None
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return None
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        parts = self.get_etag_parts(request, *args, **kwargs)
+        if parts is None:
+            return handler(request, *args, **kwargs)
+        etag = quote_etag(md5(repr(
+            (parts, request.accepted_renderer.format)
+        ).encode()).hexdigest())
+        last_modified = self.get_last_modified(request, *args, **kwargs)
+        timestamp = last_modified and int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
+
+
+class FieldsProjectionMixin:
+    """
+    Параметры ?fields= и ?omit= для выбора полей ответа.
+
+    Выбранные поля передаются сериализатору и в `.only()` запроса, чтобы
+    ненужные колонки не читались из базы.
+    """
+
+    projection_actions = ('list', 'retrieve')
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+
+    def get_projected_fields(self):
+        """Поля ответа по параметрам запроса или None, если нужны все."""
+        if self.action not in self.projection_actions:
+            return None
+        if not hasattr(self, '_projected_fields'):
+            self._projected_fields = self.parse_projected_fields()
+        return self._projected_fields
+
+    def parse_projected_fields(self):
+        params = self.request.query_params
+        requested = self.parse_field_names(params, self.fields_query_param)
+        omitted = self.parse_field_names(params, self.omit_query_param)
+        if requested is None and omitted is None:
+            return None
+        available = tuple(self.get_serializer_class()().fields)
+        unknown = ((requested or set()) | (omitted or set())) - set(available)
+        if unknown:
+            raise ValidationError({
+                self.fields_query_param:
+                    f'Неизвестные поля: {", ".join(sorted(unknown))}.'
+            })
+        return tuple(
+            name for name in available
+            if (requested is None or name in requested)
+            and name not in (omitted or ())
+        )
+
+    @staticmethod
+    def parse_field_names(params, param):
+        if param not in params:
+            return None
+        return {
+            name.strip() for value in params.getlist(param)
+            for name in value.split(',') if name.strip()
+        }
+
+    def is_projected(self, *names):
+        """Попадает ли в ответ хотя бы одно из полей `names`."""
+        fields = self.get_projected_fields()
+        return fields is None or any(name in fields for name in names)
+
+    def project_queryset(self, queryset):
+        fields = self.get_projected_fields()
+        if fields is None:
+            return queryset
+        opts = queryset.model._meta
+        columns = {opts.pk.name}
+        columns.update(
+            field.lstrip('-')
+            for field in getattr(self, 'keyset_ordering', None) or ()
+        )
+        for name in fields:
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.many_to_many:
+                columns.add(field.name)
+        return queryset.only(*columns)
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_projected_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+
 class DynamicFieldsModelSerializer(ModelSerializer):
     def __init__(self, *args, **kwargs):
         fields = kwargs.pop('fields', None)
+        omit = kwargs.pop('omit', None)
         super().__init__(*args, **kwargs)
         if fields is not None:
             allowed = set(fields)
             existing = set(self.fields)
             for field_name in existing - allowed:
                 self.fields.pop(field_name)
+        if omit is not None:
+            for field_name in set(omit) & set(self.fields):
+                self.fields.pop(field_name)
 
 
-def create_textfile(request, ingredients):
-    text = (
-        'Ваш список покупок:\n'
+def shopping_list_rows(ingredients):
+    """Строки агрегата списка покупок со сведёнными единицами."""
+    return normalize_shopping_list(
+        ingredients.values_list(
+            'ingredient__name',
+            'total_amount',
+            'ingredient__measurement_unit',
+        ).iterator()
     )
-    for ingredient in ingredients:
-        text += (
-            f'{ingredient["ingredients__name"]}: '
-            f'{ingredient["amount"]} '
-            f'{ingredient["ingredients__measurement_unit"]}\n'
+
+
+def create_shopping_list(request, ingredients):
+    """
+    Файл списка покупок в формате, выбранном согласованием содержимого.
+
+    Готовый файл берётся из кэша пользователя; иначе строки агрегата
+    читаются через `.iterator()` и отдаются частями, а небольшие файлы
+    по пути сохраняются в кэш. Форматы, которые нельзя отдавать
+    частями, собираются до ответа.
+    """
+    renderer = request.accepted_renderer
+    key = shopping_list_cache_key(request.user, renderer.format)
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    content = cache.get(key)
+    if content is None:
+        chunks = cached_stream(
+            key, renderer.export(shopping_list_rows(ingredients))
         )
-    # response = FileResponse(text, as_attachment=True)
-    response = HttpResponse(text, content_type='text/plain')
+        if not renderer.streaming:
+            content = b''.join(chunks)
+    if content is not None:
+        response = HttpResponse(content, content_type=content_type)
+    else:
+        response = StreamingHttpResponse(chunks, content_type=content_type)
     response['Content-Disposition'] = (
-        u'attachment; filename="shoppinglist.txt"'
+        f'attachment; filename="{renderer.filename}"'
     )
     return response
 
@@ -114,3 +267,33 @@ def validate_before_delete(current_user, model, pk):
             f'Данный рецепт отстуствует в {model.__name__}!'
         )
     return model_object
+
+
+def attach_recipe_cards(authors, limit=None):
+    """
+    Кладёт в `recipe_cards` каждого автора не больше `limit` его последних
+    рецептов.
+
+    Один запрос на любое число авторов: ROW_NUMBER() по автору во
+    вложенном запросе, загружаются только поля карточки рецепта.
+    """
+    cards = {author.pk: [] for author in authors}
+    if not cards:
+        return
+    ranked = Recipe.objects.filter(author_id__in=cards).annotate(
+        author_rank=Window(
+            RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )
+    ).only('author', *SHORT_RECIPE_FIELDS).order_by()
+    sql, params = ranked.query.sql_with_params()
+    query = f'SELECT * FROM ({sql}) ranked'
+    if limit is not None:
+        query += ' WHERE author_rank <= %s'
+        params = (*params, limit)
+    query += ' ORDER BY author_id, author_rank'
+    for recipe in Recipe.objects.raw(query, params):
+        cards[recipe.author_id].append(recipe)
+    for author in authors:
+        author.recipe_cards = cards[author.pk]
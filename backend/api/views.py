@@ -1,11 +1,16 @@
+from functools import partial
+
 from rest_framework import status
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.exceptions import ValidationError
 from django.contrib.auth import update_session_auth_hash
-from django.db.models import Count, Prefetch, Sum
+from django.db import transaction
+from django.db.models import Prefetch, Value
+from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
 
 from api.serializers import (
@@ -20,76 +25,176 @@ from api.serializers import (
     FollowSerializer,
     CreateFollowSerializer,
     ChangePasswordSerializer,
+    BatchSerializer,
 )
 from api.utils import (
     AnnotateMixin,
-    create_textfile,
+    ConditionalGetMixin,
+    FieldsProjectionMixin,
+    attach_recipe_cards,
+    create_shopping_list,
+    shopping_list_rows,
     validate_before_delete,
 )
+from api.cache import (
+    cached_data,
+    get_user_flags,
+    overlay_user_flags,
+    recipe_detail_cache_key,
+    recipe_list_cache_key,
+    shopping_list_cache_key,
+)
+from api.fast import FastRecipeSerializer
+from api.indexes import ingredient_index, search_ingredients
 from api.filters import (
     RecipeFilter,
     IngredientFilter,
+    recipe_facets,
 )
+from api.pagination import FeedPagination, KeysetPagination
+from api.renderers import SHOPPING_LIST_HEADER, SHOPPING_LIST_RENDERERS
 from api.permissions import (
     IsOwnerOrIsAuthenticatedOrReadOnly,
 )
+from recipes.constants import RECIPE_ORDERINGS
+from recipes.feed import fan_out
+from recipes.links import add_links, remove_links
+from recipes.registry import ingredients, tags
 from recipes.models import (
     Tag,
     Ingredient,
     Recipe,
+    RecipeIngredient,
     ShoppingCard,
+    ShoppingCartTotal,
     Favorite,
     Follow,
     User,
 )
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+@transaction.atomic
+def batch_links(request, model, field, forbidden=()):
+    """Добавление (POST) или удаление (DELETE) связей списком id."""
+    serializer = BatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = serializer.validated_data['ids']
+    if request.method == 'DELETE':
+        results = remove_links(model, field, request.user, ids)
+    else:
+        results = add_links(model, field, request.user, ids, forbidden)
+    return Response({
+        'results': [
+            {'id': pk, 'status': result} for pk, result in results.items()
+        ]
+    })
+
+
+class TagViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
+    def get_etag_parts(self, request, *args, **kwargs):
+        return (tags.version_name, tags.version)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.list_tags, request, *args, **kwargs
+        )
+
+    def list_tags(self, request, *args, **kwargs):
+        serializer = self.get_serializer(tags.all(), many=True)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def get_etag_parts(self, request, *args, **kwargs):
+        return (ingredients.version_name, ingredients.version)
 
-class RecipeViewSet(ModelViewSet, AnnotateMixin):
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.list_ingredients, request, *args, **kwargs
+        )
+
+    def list_ingredients(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name and request.query_params.get('fuzzy') in ('1', 'true'):
+            return Response(search_ingredients(name))
+        if name:
+            return Response(ingredient_index.startswith(name))
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class RecipeViewSet(ConditionalGetMixin, FieldsProjectionMixin,
+                    ModelViewSet, AnnotateMixin):
     http_method_names = ['get', 'post', 'patch', 'delete']
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (IsOwnerOrIsAuthenticatedOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    pagination_class = KeysetPagination
+    default_ordering = ('-pub_date', '-id')
+    projection_actions = ('list', 'retrieve', 'feed')
 
-    def get_queryset(self):
-        author_queryset = self.annotate_qs_is_subscribe_field(
-            User.objects.all()
-        )
-        queryset = (
-            super().get_queryset()
-                   .prefetch_related(
-                       Prefetch('author', queryset=author_queryset),
-                       Prefetch('ingredients',
-                                queryset=Ingredient.objects.all()),
-                       Prefetch('tags', queryset=Tag.objects.all()),)
+    @property
+    def keyset_ordering(self):
+        return RECIPE_ORDERINGS.get(
+            self.request.query_params.get('ordering'), self.default_ordering
         )
-        queryset = self.annotate_qs_is_favorited_field(queryset)
-        queryset = self.annotate_qs_is_in_shopping_cart_field(queryset)
-
-        if self.action == 'download_shopping_cart':
-            queryset = (
-                queryset.filter(is_in_shopping_cart=True)
-                        .only('ingredients')
-                        .values('ingredients__name',
-                                'ingredients__measurement_unit')
-                        .order_by('ingredients__name')
-                        .annotate(amount=Sum('recipeingredient__amount'))
+
+    def get_queryset(self):
+        if self.action == 'facets':
+            return super().get_queryset()
+        if self.action in ('download_shopping_cart', 'shopping_cart_summary'):
+            return ShoppingCartTotal.objects.filter(
+                user=self.request.user
+            ).order_by('ingredient__name')
+        queryset = self.project_queryset(super().get_queryset())
+        author_queryset = User.objects.all()
+        if self.action in ('list', 'retrieve', 'feed'):
+            queryset = queryset.annotate(**{
+                name: Value(False)
+                for name in ('is_favorited', 'is_in_shopping_cart')
+                if self.is_projected(name)
+            })
+            author_queryset = author_queryset.annotate(
+                is_subscribed=Value(False)
             )
+        else:
+            queryset = self.annotate_qs_is_favorited_field(queryset)
+            queryset = self.annotate_qs_is_in_shopping_cart_field(queryset)
+            author_queryset = self.annotate_qs_is_subscribe_field(
+                author_queryset
+            )
+        if self.is_projected('author'):
+            queryset = queryset.prefetch_related(
+                Prefetch('author', queryset=author_queryset)
+            )
+        if self.is_projected('ingredients'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ),
+            ))
         return queryset
 
     def get_serializer_class(self):
@@ -97,14 +202,97 @@ class RecipeViewSet(ModelViewSet, AnnotateMixin):
             return CreateRecipeSerializer
         return super().get_serializer_class()
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Форматы выгрузки списка покупок рисуют только файл, ошибки
+        # отдаются обычным JSON.
+        if (self.action == 'download_shopping_cart'
+                and getattr(response, 'exception', False)):
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_etag_parts(self, request, *args, **kwargs):
+        try:
+            pk = int(kwargs['pk'])
+        except ValueError:
+            return None
+        # Только ETag: updated_at не меняется при правке тегов,
+        # ингредиентов и автора, и Last-Modified по нему устаревал бы.
+        self.recipe_state = Recipe.objects.filter(pk=pk).values(
+            'id', 'updated_at', 'author_id', 'author__email',
+            'author__username', 'author__first_name', 'author__last_name',
+        ).first()
+        if self.recipe_state is None:
+            return None
+        flags = get_user_flags(request.user)
+        return (
+            self.recipe_state,
+            pk in flags.favorites,
+            pk in flags.cart,
+            self.recipe_state['author_id'] in flags.following,
+            tags.version,
+            ingredients.version,
+        )
+
+    def list(self, request, *args, **kwargs):
+        data = cached_data(
+            recipe_list_cache_key(request),
+            lambda: self.list_recipes(request, *args, **kwargs)
+        )
+        if self.is_projected('is_favorited', 'is_in_shopping_cart', 'author'):
+            overlay_user_flags(
+                data['results'] if isinstance(data, dict) else data,
+                get_user_flags(request.user)
+            )
+        return Response(data)
+
+    def list_recipes(self, request, *args, **kwargs):
+        serializer = FastRecipeSerializer(self.get_projected_fields())
+        queryset = serializer.get_rows(
+            self.filter_queryset(self.get_queryset()), self.keyset_ordering
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.serialize(page)
+            ).data
+        return serializer.serialize(queryset)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.retrieve_recipe, request, *args, **kwargs
+        )
+
+    def retrieve_recipe(self, request, *args, **kwargs):
+        state = getattr(self, 'recipe_state', None)
+        if state is None:
+            return super().retrieve(request, *args, **kwargs)
+        data = cached_data(
+            recipe_detail_cache_key(state['id'], self.get_projected_fields()),
+            lambda: self.get_recipe_data(state['id'])
+        )
+        overlay_user_flags([data], get_user_flags(request.user))
+        return Response(data)
+
+    def get_recipe_data(self, pk):
+        serializer = FastRecipeSerializer(self.get_projected_fields())
+        data = serializer.serialize(
+            serializer.get_rows(self.get_queryset().filter(pk=pk))
+        )
+        if not data:
+            raise Http404
+        return data[0]
+
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
+        transaction.on_commit(partial(fan_out, serializer.instance))
         data = RecipeSerializer(
-            self.get_queryset().get(id=serializer.data['id'])
+            self.get_queryset().get(id=serializer.instance.id)
         ).data
+        headers = self.get_success_headers(data)
         return Response(data, status=status.HTTP_201_CREATED, headers=headers)
 
     def update(self, request, *args, **kwargs):
@@ -115,18 +303,69 @@ class RecipeViewSet(ModelViewSet, AnnotateMixin):
         if getattr(instance, '_prefetched_objects_cache', None):
             instance._prefetched_objects_cache = {}
         data = RecipeSerializer(
-            self.get_queryset().get(id=serializer.data['id'])
+            self.get_queryset().get(id=serializer.instance.id)
         ).data
         return Response(data)
 
     @action(
         detail=False,
-        url_path='download_shopping_cart',
+        url_path='feed',
+        methods=['get'],
         permission_classes=(IsAuthenticated,)
     )
+    def feed(self, request):
+        paginator = FeedPagination()
+        page = paginator.paginate_feed(request.user, request)
+        serializer = FastRecipeSerializer(self.get_projected_fields())
+        rows = {
+            row['id']: row for row in serializer.get_rows(
+                self.get_queryset().filter(
+                    pk__in=[entry['id'] for entry in page]
+                )
+            )
+        }
+        data = serializer.serialize(
+            [rows[entry['id']] for entry in page if entry['id'] in rows]
+        )
+        overlay_user_flags(data, get_user_flags(request.user))
+        return paginator.get_paginated_response(data)
+
+    @action(detail=False, url_path='facets', methods=['get'])
+    def facets(self, request):
+        data = cached_data(
+            recipe_list_cache_key(request, 'facets'),
+            lambda: recipe_facets(self.filter_queryset(self.get_queryset()))
+        )
+        return Response(data)
+
+    @action(
+        detail=False,
+        url_path='download_shopping_cart',
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=SHOPPING_LIST_RENDERERS,
+    )
     def download_shopping_cart(self, request):
         ingredients_dict = self.get_queryset()
-        return create_textfile(request, ingredients_dict)
+        return create_shopping_list(request, ingredients_dict)
+
+    @action(
+        detail=False,
+        url_path='shopping_cart_summary',
+        methods=['get'],
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_summary(self, request):
+        data = cached_data(
+            shopping_list_cache_key(request.user, 'summary'),
+            lambda: {
+                'recipes_count': len(get_user_flags(request.user).cart),
+                'ingredients': [
+                    dict(zip(SHOPPING_LIST_HEADER, row))
+                    for row in shopping_list_rows(self.get_queryset())
+                ],
+            }
+        )
+        return Response(data)
 
     @action(
         detail=True,
@@ -142,12 +381,22 @@ class RecipeViewSet(ModelViewSet, AnnotateMixin):
         return Response(data=serializer.data, status=status.HTTP_201_CREATED)
 
     @shopping_cart.mapping.delete
+    @transaction.atomic
     def delete_shopping_cart(self, request, pk):
         shopping_card = validate_before_delete(request.user, ShoppingCard, pk)
         shopping_card.delete()
         return Response(data={'message': 'DELETED'},
                         status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        url_path='shopping_cart/batch',
+        methods=['post', 'delete'],
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_batch(self, request):
+        return batch_links(request, ShoppingCard, 'recipe')
+
     @action(
         detail=True,
         url_path='favorite',
@@ -162,38 +411,62 @@ class RecipeViewSet(ModelViewSet, AnnotateMixin):
         return Response(data=serializer.data, status=status.HTTP_201_CREATED)
 
     @favorite.mapping.delete
+    @transaction.atomic
     def delete_favorite(self, request, pk):
         favorite = validate_before_delete(request.user, Favorite, pk)
         favorite.delete()
         return Response(data={'message': 'DELETED'},
                         status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        url_path='favorite/batch',
+        methods=['post', 'delete'],
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorite_batch(self, request):
+        return batch_links(request, Favorite, 'recipe')
+
 
-class UserViewSet(ModelViewSet, AnnotateMixin):
+class UserViewSet(ConditionalGetMixin, FieldsProjectionMixin,
+                  ModelViewSet, AnnotateMixin):
     http_method_names = ['get', 'post', 'delete']
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (AllowAny,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('username', 'id')
+    projection_actions = ('list', 'retrieve', 'subscriptions', 'about_me')
 
     def get_queryset(self):
-        queryset = self.annotate_qs_is_subscribe_field(super().get_queryset())
+        queryset = self.project_queryset(super().get_queryset())
+        if (self.action == 'subscriptions'
+                or self.is_projected('is_subscribed')):
+            queryset = self.annotate_qs_is_subscribe_field(queryset)
 
         if self.action == 'subscriptions':
-            queryset = (
-                queryset.filter(is_subscribed=True)
-                        .prefetch_related('recipes')
-                        .annotate(recipes_count=Count('recipes'))
-            )
-            return queryset
+            queryset = queryset.filter(is_subscribed=True)
+        return queryset
 
-        if self.action in ['subscribe', 'post_subscribe']:
-            queryset = (
-                queryset.prefetch_related('recipes')
-                        .annotate(recipes_count=Count('recipes'))
-            )
-            return queryset
+    def get_recipes_limit(self):
+        value = self.request.query_params.get('recipes_limit')
+        if value is None:
+            return None
+        try:
+            limit = int(value)
+            if limit < 0:
+                raise ValueError
+        except ValueError:
+            raise ValidationError({
+                'recipes_limit': 'Ожидается неотрицательное целое число.'
+            })
+        return limit
 
-        return queryset
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('subscriptions', 'subscribe'):
+            context['recipes_limit'] = self.get_recipes_limit()
+        return context
 
     def get_serializer_class(self):
         if self.action in ('create',):
@@ -228,12 +501,15 @@ class UserViewSet(ModelViewSet, AnnotateMixin):
         permission_classes=(IsAuthenticated,)
     )
     def subscriptions(self, request):
+        limit = self.get_recipes_limit()
         subscriptions = self.get_queryset()
         page = self.paginate_queryset(subscriptions)
+        authors = list(subscriptions) if page is None else page
+        if self.is_projected('recipes'):
+            attach_recipe_cards(authors, limit)
+        serializer = self.get_serializer(authors, many=True)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(subscriptions, many=True)
         return Response(serializer.data)
 
     @action(
@@ -245,18 +521,22 @@ class UserViewSet(ModelViewSet, AnnotateMixin):
     )
     def subscribe(self, request, pk):
         # instance = self.get_object()
+        limit = self.get_recipes_limit()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        author = self.get_object()
+        attach_recipe_cards([author], limit)
         return Response(
             FollowSerializer(
-                self.get_object(),
+                author,
                 context=serializer.context
             ).data,
             status=status.HTTP_201_CREATED
         )
 
     @subscribe.mapping.delete
+    @transaction.atomic
     def delete_subscribe(self, request, pk):
         instance = self.get_object()
         try:
@@ -272,6 +552,17 @@ class UserViewSet(ModelViewSet, AnnotateMixin):
         return Response(data={'message': 'SUBSCRIBE DELETED'},
                         status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        url_path='subscribe/batch',
+        methods=['post', 'delete'],
+        permission_classes=(IsAuthenticated,)
+    )
+    def subscribe_batch(self, request):
+        return batch_links(
+            request, Follow, 'following', forbidden={request.user.pk}
+        )
+
     @action(
         detail=False,
         methods=['get'],
@@ -280,6 +571,14 @@ class UserViewSet(ModelViewSet, AnnotateMixin):
         permission_classes=(IsAuthenticated,)
     )
     def about_me(self, request):
+        return self.conditional_response(self.current_user, request)
+
+    def get_etag_parts(self, request, *args, **kwargs):
+        user = request.user
+        return (user.pk, user.email, user.username,
+                user.first_name, user.last_name)
+
+    def current_user(self, request):
         current_user = request.user
         serializer = self.get_serializer(self.get_queryset()
                                          .get(username=current_user))
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -38,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -91,6 +95,32 @@ DATABASES = {
     }
 }
 
+if os.getenv('USE_SQLITE', 'False') == 'True':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Version counters and response caches must be shared by all workers.
+if ('gunicorn' in sys.modules
+        and CACHES['default']['BACKEND'].endswith('LocMemCache')):
+    raise ImproperlyConfigured(
+        'LocMemCache is per-process; set CACHE_BACKEND and CACHE_LOCATION '
+        'to a shared cache when running under gunicorn.'
+    )
+
 
 # USER_MODEL
 AUTH_USER_MODEL = 'users.CustomUser'
@@ -161,3 +191,7 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+SHOPPING_LIST_FONT = os.getenv(
+    'SHOPPING_LIST_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
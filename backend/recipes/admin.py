@@ -1,5 +1,4 @@
 from django.contrib import admin
-from django.db.models import Count
 
 from recipes.models import (
     Tag,
@@ -27,13 +26,20 @@ class IngredientAdmin(admin.ModelAdmin):
     """Ingredient info."""
 
     list_display = ['id', 'name', 'measurement_unit']
-    list_filter = ['name']
+    search_fields = ['name']
+    ordering = ['name']
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     min_num = 1
     extra = 1
+    autocomplete_fields = ['ingredient']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredient'
+        )
 
 
 @admin.register(Recipe)
@@ -43,7 +49,11 @@ class RecipeAdmin(admin.ModelAdmin):
     inlines = [RecipeIngredientInline, ]
     list_display = ['id', 'author', 'name', 'get_text',
                     'cooking_time', 'favorited']
-    list_filter = ['name', 'author', 'tags']
+    list_filter = ['tags']
+    list_select_related = ['author']
+    autocomplete_fields = ['author']
+    search_fields = ['name', 'author__username', 'author__email']
+    show_full_result_count = False
 
     def get_text(self, obj):
         return obj.text[:SHORT_VIEW_LENGTH]
@@ -51,13 +61,10 @@ class RecipeAdmin(admin.ModelAdmin):
     get_text.short_description = 'text'
 
     def favorited(self, obj):
-        querry = (
-            Favorite.objects
-                    .filter(recipe=obj).aggregate(count=Count("user"))
-        )
-        return querry['count']
+        return obj.favorites_count
 
     favorited.short_description = "Кол-во избранных"
+    favorited.admin_order_field = 'favorites_count'
 
 
 @admin.register(RecipeIngredient)
@@ -65,19 +72,40 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
     """RecipeIngredient info."""
 
     list_display = ['recipe', 'ingredient', 'amount']
-    list_filter = ['ingredient']
+    list_select_related = ['recipe', 'ingredient']
+    autocomplete_fields = ['recipe', 'ingredient']
+    search_fields = ['recipe__name', 'ingredient__name']
+    show_full_result_count = False
 
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
     """Follow info."""
 
+    list_display = ['id', 'user', 'following']
+    list_select_related = ['user', 'following']
+    autocomplete_fields = ['user', 'following']
+    search_fields = ['user__username', 'following__username']
+    show_full_result_count = False
+
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     """Favorite info."""
 
+    list_display = ['id', 'user', 'recipe']
+    list_select_related = ['user', 'recipe']
+    autocomplete_fields = ['user', 'recipe']
+    search_fields = ['user__username', 'recipe__name']
+    show_full_result_count = False
+
 
 @admin.register(ShoppingCard)
 class ShoppingCardAdmin(admin.ModelAdmin):
     """ShoppingCard info."""
+
+    list_display = ['id', 'user', 'recipe']
+    list_select_related = ['user', 'recipe']
+    autocomplete_fields = ['user', 'recipe']
+    search_fields = ['user__username', 'recipe__name']
+    show_full_result_count = False
@@ -0,0 +1,109 @@
+from collections import Counter
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from recipes.constants import USER_FLAGS_VERSION
+from recipes.models import RecipeIngredient, ShoppingCard, ShoppingCartTotal
+from recipes.versions import bump_version
+
+
+def recipe_amounts(recipe_id):
+    """{id ингредиента: количество} для рецепта."""
+    return Counter(dict(
+        RecipeIngredient.objects.filter(recipe_id=recipe_id)
+                                .values_list('ingredient_id', 'amount')
+    ))
+
+
+def change_cart_totals(user_ids, deltas):
+    """
+    Сдвигает суммы ингредиентов в списках покупок пользователей.
+
+    `deltas` — {id ингредиента: изменение}, одинаковое для всех
+    `user_ids`. Обнулившиеся строки удаляются.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    user_ids = list(user_ids)
+    if not user_ids or not deltas:
+        return
+    ShoppingCartTotal.objects.bulk_create(
+        [
+            ShoppingCartTotal(user_id=user_id, ingredient_id=ingredient_id)
+            for user_id in user_ids for ingredient_id in deltas
+        ],
+        ignore_conflicts=True,
+    )
+    totals = ShoppingCartTotal.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    )
+    totals.update(total_amount=F('total_amount') + Case(
+        *(When(ingredient_id=pk, then=Value(delta))
+          for pk, delta in deltas.items()),
+        output_field=IntegerField(),
+    ))
+    totals.filter(total_amount__lte=0).delete()
+
+
+def recipe_ingredients_changed(recipe_id, old_amounts):
+    """Переносит изменение состава рецепта в списки покупок с ним."""
+    deltas = recipe_amounts(recipe_id)
+    deltas.subtract(old_amounts)
+    change_cart_totals(
+        ShoppingCard.objects.filter(recipe_id=recipe_id)
+                            .values_list('user_id', flat=True),
+        deltas,
+    )
+
+
+def expected_cart_totals():
+    """Суммы по спискам покупок, посчитанные заново по связующим таблицам."""
+    rows = ShoppingCard.objects.values(
+        'user_id',
+        ingredient_id=F('recipe__recipeingredient__ingredient_id'),
+    ).annotate(
+        total=Sum('recipe__recipeingredient__amount')
+    ).order_by()
+    return {
+        (row['user_id'], row['ingredient_id']): row['total']
+        for row in rows if row['ingredient_id'] is not None
+    }
+
+
+def check_cart_totals(fix=False):
+    """
+    Сверяет таблицу сумм со списками покупок.
+
+    Возвращает число расхождений; с `fix` приводит таблицу в порядок и
+    сдвигает поколение затронутых пользователей, чтобы их выгрузки и
+    сводки списка покупок не брались из кэша.
+    """
+    expected = expected_cart_totals()
+    actual = {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in ShoppingCartTotal.objects
+        .values_list('user_id', 'ingredient_id', 'total_amount')
+    }
+    drifted = {
+        key for key in expected.keys() | actual.keys()
+        if expected.get(key) != actual.get(key)
+    }
+    if fix and drifted:
+        with transaction.atomic():
+            for user_id, ingredient_id in drifted & actual.keys():
+                ShoppingCartTotal.objects.filter(
+                    user_id=user_id, ingredient_id=ingredient_id
+                ).delete()
+            ShoppingCartTotal.objects.bulk_create(
+                ShoppingCartTotal(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    total_amount=expected[user_id, ingredient_id],
+                )
+                for user_id, ingredient_id in drifted & expected.keys()
+            )
+            for user_id in {user_id for user_id, _ in drifted}:
+                transaction.on_commit(partial(
+                    bump_version, USER_FLAGS_VERSION.format(user_id)
+                ))
+    return len(drifted)
@@ -1,3 +1,39 @@
+from datetime import datetime, timezone
+
 MAX_TEXT_LENGTH = 250
 MAX_NAME_LENGTH = 200
 SHORT_VIEW_LENGTH = 30
+INGREDIENTS_VERSION = 'ingredients'
+INGREDIENT_SEARCH_LIMIT = 20
+TRIGRAM_SIMILARITY_THRESHOLD = 0.3
+TAGS_VERSION = 'tags'
+REGISTRY_CHECK_INTERVAL = 1
+RECIPES_VERSION = 'recipes'
+POPULARITY_VERSION = 'popularity'
+RECIPE_VERSION = 'recipe:{}'
+AUTHORS_VERSION = 'authors'
+RECIPES_CACHE_TIMEOUT = 60 * 60 * 24
+USER_FLAGS_VERSION = 'user_flags:{}'
+SHORT_RECIPE_FIELDS = ('id', 'name', 'image', 'cooking_time')
+RECIPE_FIELDS = (
+    'id', 'is_favorited', 'is_in_shopping_cart', 'ingredients', 'image',
+    'tags', 'author', 'name', 'text', 'cooking_time',
+)
+SEARCH_CONFIG = 'russian'
+SEARCH_NAME_WEIGHT = 10.0
+SEARCH_TEXT_WEIGHT = 1.0
+COOKING_TIME_BUCKETS = (15, 30, 60, 120)
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+TRENDING_HALF_LIFE = 60 * 60 * 72
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_CART_WEIGHT = 0.5
+RECIPE_ORDERINGS = {
+    'popular': ('-favorites_count', '-in_carts_count', '-id'),
+    'trending': ('-trending_score', '-id'),
+}
+# Ниже лимита элемента memcached (1 МБ) с запасом на pickle и ключ.
+SHOPPING_LIST_CACHE_MAX_SIZE = 900 * 1024
+BATCH_MAX_SIZE = 100
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+FEED_BACKFILL_SIZE = 100
+FEED_ORDERING = ('-pub_date', '-id')
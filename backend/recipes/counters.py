@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.constants import POPULARITY_VERSION
+from recipes.models import Favorite, Follow, Recipe, ShoppingCard
+from recipes.versions import bump_version
+
+COUNTERS = (
+    (Favorite, 'recipe', 'favorites_count'),
+    (ShoppingCard, 'recipe', 'in_carts_count'),
+    (Follow, 'following', 'followers_count'),
+    (Recipe, 'author', 'recipes_count'),
+)
+# Счётчики, по которым сортируется ordering=popular.
+POPULARITY_COUNTERS = {'favorites_count', 'in_carts_count'}
+
+
+def popularity_changed(counters):
+    """Сдвигает поколение популярных списков, если менялись их счётчики."""
+    if POPULARITY_COUNTERS & set(counters):
+        transaction.on_commit(lambda: bump_version(POPULARITY_VERSION))
+
+
+def counted_by(model):
+    return [
+        (field, counter) for counted, field, counter in COUNTERS
+        if counted is model
+    ]
+
+
+def change_counters(model, instances, delta):
+    """Сдвигает счётчики объектов, на которые ссылаются `instances`."""
+    for field, counter in counted_by(model):
+        target = model._meta.get_field(field).related_model
+        pks = {}
+        for instance in instances:
+            pk = getattr(instance, f'{field}_id')
+            pks[pk] = pks.get(pk, 0) + delta
+        by_value = {}
+        for pk, value in pks.items():
+            by_value.setdefault(value, []).append(pk)
+        for value, value_pks in by_value.items():
+            # Разошедшийся до нуля счётчик не уходит в минус.
+            target.objects.filter(pk__in=value_pks).update(
+                **{counter: Greatest(F(counter) + value, Value(0))}
+            )
+    popularity_changed(counter for _, counter in counted_by(model))
+
+
+def reconcile_counters(counters=COUNTERS):
+    """Пересчитывает разошедшиеся счётчики, возвращает число исправлений."""
+    fixed = {}
+    changed = []
+    for model, field, counter in counters:
+        target = model._meta.get_field(field).related_model
+        actual = Coalesce(
+            Subquery(
+                model.objects.filter(**{field: OuterRef('pk')})
+                             .order_by()
+                             .values(field)
+                             .annotate(count=Count('pk'))
+                             .values('count')
+            ),
+            Value(0),
+        )
+        drifted = list(
+            target.objects.annotate(actual=actual)
+                          .exclude(**{counter: F('actual')})
+                          .values_list('pk', flat=True)
+        )
+        if drifted:
+            target.objects.filter(pk__in=drifted).update(**{counter: actual})
+            changed.append(counter)
+        fixed[f'{target.__name__}.{counter}'] = len(drifted)
+    popularity_changed(changed)
+    return fixed
@@ -0,0 +1,93 @@
+from heapq import merge
+from itertools import islice
+
+from django.db.models import Q
+
+from recipes.constants import FEED_BACKFILL_SIZE, FEED_FANOUT_MAX_FOLLOWERS
+from recipes.models import FeedEntry, Follow, Recipe, User
+
+
+def fan_out(recipe):
+    """
+    Рассылает новый рецепт в ленты подписчиков автора.
+
+    Вызывается после фиксации рецепта. Рецепты авторов, у которых
+    подписчиков больше FEED_FANOUT_MAX_FOLLOWERS, не рассылаются:
+    feed_page подмешивает их при чтении.
+    """
+    # Число подписчиков читается из базы: у автора из запроса оно
+    # может быть устаревшим.
+    followers_count = User.objects.filter(
+        pk=recipe.author_id
+    ).values_list('followers_count', flat=True).first()
+    if followers_count is None or (
+            followers_count > FEED_FANOUT_MAX_FOLLOWERS):
+        return
+    # Флаг ставится до рассылки: подписавшийся в этот момент получит
+    # рецепт при заполнении своей ленты.
+    Recipe.objects.filter(pk=recipe.pk).update(fanned_out=True)
+    followers = Follow.objects.filter(
+        following_id=recipe.author_id
+    ).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe=recipe,
+                      pub_date=recipe.pub_date)
+            for user_id in followers
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def backfill_feed(user_id, author_ids):
+    """Добавляет в ленту последние разосланные рецепты новых подписок."""
+    entries = []
+    for author_id in author_ids:
+        recipes = Recipe.objects.filter(
+            author_id=author_id, fanned_out=True
+        ).order_by('-pub_date', '-id').values_list('id', 'pub_date')
+        entries += [
+            FeedEntry(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes[:FEED_BACKFILL_SIZE]
+        ]
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def trim_feed(user_id, author_ids):
+    """Убирает из ленты рецепты авторов, от которых пользователь отписался."""
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id__in=author_ids
+    ).delete()
+
+
+def feed_page(user, size, position=None):
+    """
+    До `size` позиций ленты подписок после `position`, новые первыми.
+
+    Позиции — словари с `pub_date` и `id` рецепта, `position` — такая же
+    пара из курсора. Разосланные рецепты читаются из таблицы ленты,
+    остальные рецепты авторов из подписок (популярных и не прошедших
+    рассылку) подмешиваются при чтении.
+    """
+    pushed = FeedEntry.objects.filter(user=user)
+    pulled = Recipe.objects.filter(fanned_out=False, author__follow__user=user)
+    if position is not None:
+        pub_date, recipe_id = position
+        pushed = pushed.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, recipe_id__lt=recipe_id)
+        )
+        pulled = pulled.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=recipe_id)
+        )
+    entries = merge(
+        pushed.order_by('-pub_date', '-recipe_id')
+              .values_list('pub_date', 'recipe_id')[:size],
+        pulled.order_by('-pub_date', '-id')
+              .values_list('pub_date', 'id')[:size],
+        reverse=True,
+    )
+    return [
+        {'pub_date': pub_date, 'id': recipe_id}
+        for pub_date, recipe_id in islice(entries, size)
+    ]
@@ -0,0 +1,160 @@
+from collections import Counter
+from functools import partial
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, OuterRef
+
+from recipes.carts import change_cart_totals
+from recipes.constants import USER_FLAGS_VERSION
+from recipes.counters import change_counters
+from recipes.feed import backfill_feed, trim_feed
+from recipes.models import Follow, RecipeIngredient, ShoppingCard
+from recipes.versions import bump_version
+
+CREATED = 'created'
+DELETED = 'deleted'
+EXISTS = 'exists'
+ABSENT = 'absent'
+NOT_FOUND = 'not_found'
+FORBIDDEN = 'forbidden'
+
+
+def links_changed(model, user, links, delta):
+    """
+    То, что для одиночных связей делают сигналы: счётчики, суммы списка
+    покупок, ленту подписок и поколение флагов пользователя.
+    """
+    if not links:
+        return
+    change_counters(model, links, delta)
+    if model is ShoppingCard:
+        amounts = Counter()
+        for ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe_id__in=[link.recipe_id for link in links]
+        ).values_list('ingredient_id', 'amount'):
+            amounts[ingredient_id] += amount * delta
+        change_cart_totals([user.pk], amounts)
+    if model is Follow:
+        author_ids = [link.following_id for link in links]
+        if delta > 0:
+            backfill_feed(user.pk, author_ids)
+        else:
+            trim_feed(user.pk, author_ids)
+    transaction.on_commit(partial(
+        bump_version, USER_FLAGS_VERSION.format(user.pk)
+    ))
+
+
+def link_states(model, field, user, ids):
+    """{id: связан ли с пользователем} для существующих объектов из `ids`."""
+    target = model._meta.get_field(field).related_model
+    return dict(
+        target.objects.filter(pk__in=ids).annotate(linked=Exists(
+            model.objects.filter(user=user, **{field: OuterRef('pk')})
+        )).values_list('pk', 'linked')
+    )
+
+
+def insert_links(model, links):
+    """
+    Вставляет связи без сигналов и возвращает реально вставленные.
+
+    Обычно хватает одного INSERT. Если связь успела появиться после
+    проверки, связи вставляются по одной, и побочные эффекты достаются
+    только своим строкам.
+    """
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(links)
+        return links
+    except IntegrityError:
+        pass
+    inserted = []
+    for link in links:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([link])
+        except IntegrityError:
+            continue
+        inserted.append(link)
+    return inserted
+
+
+def delete_links(model, pks):
+    """Удаляет строки связей одним DELETE, без сигналов по каждой строке."""
+    if not pks:
+        return
+    opts = model._meta
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM {} WHERE {} IN ({})'.format(
+                connection.ops.quote_name(opts.db_table),
+                connection.ops.quote_name(opts.pk.column),
+                ', '.join(['%s'] * len(pks)),
+            ),
+            pks,
+        )
+
+
+def add_links(model, field, user, ids, forbidden=()):
+    """
+    Связывает пользователя с объектами `ids`.
+
+    Возвращает {id: результат} в порядке `ids`.
+    """
+    states = link_states(model, field, user, ids)
+    results = {}
+    links = []
+    for pk in ids:
+        if pk in results:
+            continue
+        if pk not in states:
+            results[pk] = NOT_FOUND
+        elif pk in forbidden:
+            results[pk] = FORBIDDEN
+        elif states[pk]:
+            results[pk] = EXISTS
+        else:
+            results[pk] = CREATED
+            links.append(model(user=user, **{f'{field}_id': pk}))
+    inserted = insert_links(model, links)
+    inserted_ids = {getattr(link, f'{field}_id') for link in inserted}
+    for link in links:
+        if getattr(link, f'{field}_id') not in inserted_ids:
+            results[getattr(link, f'{field}_id')] = EXISTS
+    links_changed(model, user, inserted, 1)
+    return results
+
+
+def remove_links(model, field, user, ids):
+    """
+    Удаляет связи пользователя с объектами `ids` одним DELETE.
+
+    Строки связей блокируются до удаления, поэтому побочные эффекты
+    считаются только по строкам, которые удалил этот запрос.
+
+    Возвращает {id: результат} в порядке `ids`.
+    """
+    states = link_states(model, field, user, ids)
+    linked = dict(
+        model.objects.select_for_update().filter(
+            user=user, **{f'{field}_id__in': list(states)}
+        ).values_list(f'{field}_id', 'pk')
+    )
+    results = {}
+    links = []
+    for pk in ids:
+        if pk in results:
+            continue
+        if pk not in states:
+            results[pk] = NOT_FOUND
+        elif pk not in linked:
+            results[pk] = ABSENT
+        else:
+            results[pk] = DELETED
+            links.append(
+                model(pk=linked[pk], user=user, **{f'{field}_id': pk})
+            )
+    delete_links(model, [link.pk for link in links])
+    links_changed(model, user, links, -1)
+    return results
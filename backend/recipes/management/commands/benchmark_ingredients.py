@@ -0,0 +1,44 @@
+from timeit import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.filters import IngredientFilter
+from api.indexes import ingredient_index
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Сравнение фильтра ингредиентов с индексом в памяти'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        prefixes = sorted({
+            name[:length]
+            for name in Ingredient.objects.values_list('name', flat=True)
+            for length in (1, 2, 3)
+        })
+        repeat = options['repeat']
+
+        def run_filter():
+            for prefix in prefixes:
+                list(IngredientFilter(
+                    {'name': prefix}, queryset=Ingredient.objects.all()
+                ).qs.values('id', 'name', 'measurement_unit'))
+
+        def run_index():
+            for prefix in prefixes:
+                ingredient_index.startswith(prefix)
+
+        ingredient_index.startswith('')
+        lookups = len(prefixes) * repeat
+        for label, func in (('IngredientFilter', run_filter),
+                            ('IngredientIndex', run_index)):
+            with CaptureQueriesContext(connection) as queries:
+                elapsed = timeit(func, number=repeat)
+            print(f'{label}: {lookups} запросов автодополнения, '
+                  f'{elapsed * 1000 / lookups:.3f} мс на запрос, '
+                  f'{len(queries)} обращений к БД')
@@ -0,0 +1,63 @@
+from timeit import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from api.filters import RecipeFilter
+from recipes.models import Ingredient, Recipe
+from recipes.seeding import link_random_ingredients, seed_recipes
+
+
+class Command(BaseCommand):
+    help = ('Поиск рецептов по продуктам в наличии: агрегация по всей '
+            'связующей таблице против фильтра have с полусоединением по '
+            'индексу. Запускать на отдельной базе: с --recipes команда '
+            'досоздаёт синтетические рецепты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=0)
+        parser.add_argument('--have', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['recipes']:
+            seed_recipes(options['recipes'], link_random_ingredients)
+        have = list(
+            Ingredient.objects.order_by('?').values_list('pk', flat=True)
+            [:options['have']]
+        )
+        if not have:
+            raise CommandError('Нет ингредиентов для замера.')
+        repeat = options['repeat']
+
+        def run_aggregate():
+            return list(Recipe.objects.annotate(
+                covered=Count(
+                    'recipeingredient',
+                    filter=Q(recipeingredient__ingredient_id__in=have)
+                ),
+                total=Count('recipeingredient'),
+            ).filter(covered__gt=0).annotate(
+                pantry_score=Cast('covered', FloatField()) / F('total')
+            ).order_by('-pantry_score', '-pub_date', '-id').values_list(
+                'pk', flat=True
+            )[:6])
+
+        queryset = RecipeFilter(
+            {'have': ','.join(map(str, have))},
+            queryset=Recipe.objects.all(),
+        ).qs
+
+        def run_filter():
+            return list(queryset.values_list('pk', flat=True)[:6])
+
+        if run_aggregate() != run_filter():
+            raise CommandError('Результаты агрегации и фильтра разошлись.')
+        print(f'Рецептов: {Recipe.objects.count()}, '
+              f'продуктов в наличии: {len(have)}, '
+              f'рецептов с совпадениями: {queryset.count()}')
+        for label, func in (('Агрегация по RecipeIngredient', run_aggregate),
+                            ('Фильтр have', run_filter)):
+            elapsed = timeit(func, number=repeat)
+            print(f'{label}: {elapsed * 1000 / repeat:.2f} мс на запрос')
@@ -0,0 +1,53 @@
+from timeit import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch, Value
+from rest_framework.renderers import JSONRenderer
+
+from api.fast import FastRecipeSerializer
+from api.serializers import RecipeSerializer
+from recipes.models import Recipe, User
+
+
+class Command(BaseCommand):
+    help = ('Скорость RecipeSerializer и FastRecipeSerializer на странице '
+            'списка рецептов с проверкой совпадения ответов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        limit, repeat = options['limit'], options['repeat']
+        queryset = Recipe.objects.order_by('-pub_date', '-id').annotate(
+            is_favorited=Value(False),
+            is_in_shopping_cart=Value(False),
+        )
+
+        def run_drf():
+            recipes = queryset.prefetch_related(
+                Prefetch('author', queryset=User.objects.annotate(
+                    is_subscribed=Value(False)
+                )),
+                'recipeingredient_set',
+            )[:limit]
+            return RecipeSerializer(recipes, many=True).data
+
+        def run_fast():
+            serializer = FastRecipeSerializer()
+            return serializer.serialize(
+                serializer.get_rows(queryset)[:limit]
+            )
+
+        renderer = JSONRenderer()
+        expected = renderer.render(run_drf())
+        if renderer.render(run_fast()) != expected:
+            raise CommandError('Ответы сериализаторов различаются.')
+        rows = len(run_fast())
+        if not rows:
+            raise CommandError('Нет рецептов для замера.')
+        for label, func in (('RecipeSerializer', run_drf),
+                            ('FastRecipeSerializer', run_fast)):
+            elapsed = timeit(func, number=repeat)
+            print(f'{label}: {rows * repeat / elapsed:.0f} строк/с '
+                  f'({rows} строк x {repeat})')
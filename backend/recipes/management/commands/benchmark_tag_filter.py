@@ -0,0 +1,54 @@
+from timeit import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe, Tag
+from recipes.seeding import link_random_tags, seed_recipes
+
+
+class Command(BaseCommand):
+    help = ('Планы и время запросов списка и количества рецептов '
+            'с фильтром по тегам. Запускать на отдельной базе: '
+            'с --recipes команда досоздаёт синтетические рецепты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def explain(self, sql, params):
+        prefix = ('EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite'
+                  else 'EXPLAIN')
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return '\n'.join(
+                '    ' + ' '.join(str(column) for column in row)
+                for row in cursor.fetchall()
+            )
+
+    def handle(self, *args, **options):
+        if options['recipes']:
+            seed_recipes(options['recipes'], link_random_tags)
+        slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+        print(f'Рецептов: {Recipe.objects.count()}, теги: {slugs}')
+        for mode in ('any', 'all'):
+            queryset = RecipeFilter(
+                {'tags': slugs, 'tags_mode': mode},
+                queryset=Recipe.objects.all(),
+            ).qs
+            page = queryset.values('pk')[:6]
+            sql, params = page.query.sql_with_params()
+            count_sql, count_params = (
+                queryset.order_by().values('pk').query.sql_with_params()
+            )
+            count_sql = f'SELECT COUNT(*) FROM ({count_sql}) counted'
+            print(f'\ntags_mode={mode}')
+            print('  список:', self.explain(sql, params), sep='\n')
+            print('  количество:', self.explain(count_sql, count_params),
+                  sep='\n')
+            list_time = timeit(lambda: list(page), number=options['repeat'])
+            count_time = timeit(queryset.count, number=options['repeat'])
+            print(f'  список: {list_time * 1000 / options["repeat"]:.2f} мс, '
+                  f'количество: '
+                  f'{count_time * 1000 / options["repeat"]:.2f} мс')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.carts import check_cart_totals
+
+
+class Command(BaseCommand):
+    help = 'Сверка сумм ингредиентов в списках покупок с самими списками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Исправить найденные расхождения',
+        )
+
+    def handle(self, *args, **options):
+        drifted = check_cart_totals(fix=options['fix'])
+        action = 'исправлено' if options['fix'] else 'найдено'
+        print(f'Расхождений {action}: {drifted}')
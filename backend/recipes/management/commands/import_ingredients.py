@@ -1,9 +1,11 @@
 from django.core.management.base import BaseCommand
 
+from recipes.constants import INGREDIENTS_VERSION
 from recipes.models import (
     Ingredient,
 )
 from recipes.management.utils import import_simple_csv
+from recipes.versions import bump_version
 
 
 class Command(BaseCommand):
@@ -11,4 +13,5 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         import_simple_csv('ingredients.csv', Ingredient)
+        bump_version(INGREDIENTS_VERSION)
         print('Все ингредиенты были успешно импрортированы.')
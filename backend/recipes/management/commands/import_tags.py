@@ -1,9 +1,11 @@
 from django.core.management.base import BaseCommand
 
+from recipes.constants import TAGS_VERSION
 from recipes.models import (
     Tag,
 )
 from recipes.management.utils import import_simple_csv
+from recipes.versions import bump_version
 
 
 class Command(BaseCommand):
@@ -11,4 +13,5 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         import_simple_csv('tags.csv', Tag)
+        bump_version(TAGS_VERSION)
         print('Все теги были успешно импрортированы.')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт счётчиков избранного, покупок, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        for counter, fixed in reconcile_counters().items():
+            print(f'{counter}: исправлено {fixed}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.scores import update_trending_scores
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт трендового рейтинга рецептов, добавленных в избранное '
+            'или список покупок с прошлого запуска')
+
+    def handle(self, *args, **options):
+        updated = update_trending_scores(timezone.now())
+        print(f'Обновлён рейтинг рецептов: {updated}')
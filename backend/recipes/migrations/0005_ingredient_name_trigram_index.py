@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from recipes.operations import VendorRunSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_alter_recipe_cooking_time'),
+    ]
+
+    operations = [
+        VendorRunSQL(
+            'postgresql',
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm;',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        VendorRunSQL(
+            'postgresql',
+            'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_trgm '
+            'ON recipes_ingredient USING gin (name gin_trgm_ops);',
+            reverse_sql='DROP INDEX IF EXISTS recipes_ingredient_name_trgm;',
+        ),
+    ]
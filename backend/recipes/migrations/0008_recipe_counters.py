@@ -0,0 +1,50 @@
+# Generated by Django 3.2.3 on 2026-10-18 05:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('Favorite', 'recipe', 'favorites_count'),
+    ('ShoppingCard', 'recipe', 'in_carts_count'),
+    ('Follow', 'following', 'followers_count'),
+    ('Recipe', 'author', 'recipes_count'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for model_name, field, counter in COUNTERS:
+        model = apps.get_model('recipes', model_name)
+        target = model._meta.get_field(field).related_model
+        target.objects.update(**{counter: Coalesce(
+            Subquery(
+                model.objects.filter(**{field: OuterRef('pk')})
+                             .order_by()
+                             .values(field)
+                             .annotate(count=Count('pk'))
+                             .values('count')
+            ),
+            Value(0),
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_keyset_indexes'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Кол-во добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Кол-во добавлений в списки покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
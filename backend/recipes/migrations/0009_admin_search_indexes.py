@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from recipes.operations import VendorRunSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_counters'),
+    ]
+
+    operations = [
+        VendorRunSQL(
+            'postgresql',
+            'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_upper_trgm '
+            'ON recipes_ingredient '
+            'USING gin ((UPPER(name::text)) gin_trgm_ops);',
+            reverse_sql=(
+                'DROP INDEX IF EXISTS recipes_ingredient_name_upper_trgm;'
+            ),
+        ),
+        VendorRunSQL(
+            'postgresql',
+            'CREATE INDEX IF NOT EXISTS recipes_recipe_name_upper_trgm '
+            'ON recipes_recipe '
+            'USING gin ((UPPER(name::text)) gin_trgm_ops);',
+            reverse_sql='DROP INDEX IF EXISTS recipes_recipe_name_upper_trgm;',
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 3.2.3 on 2026-10-18 05:51
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+from recipes.operations import VendorRunSQL
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('pg_catalog.russian', "
+    "coalesce({row}name, '')), 'A') || "
+    "setweight(to_tsvector('pg_catalog.russian', "
+    "coalesce({row}text, '')), 'B')"
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_tags_tag_recipe_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        VendorRunSQL(
+            'postgresql',
+            [
+                'CREATE FUNCTION recipes_recipe_search_vector_update() '
+                'RETURNS trigger AS $$ BEGIN '
+                'NEW.search_vector := {}; '
+                'RETURN NEW; END $$ LANGUAGE plpgsql;'.format(
+                    SEARCH_VECTOR.format(row='NEW.')
+                ),
+                'CREATE TRIGGER recipes_recipe_search_vector_trigger '
+                'BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe '
+                'FOR EACH ROW '
+                'EXECUTE PROCEDURE recipes_recipe_search_vector_update();',
+                'UPDATE recipes_recipe SET search_vector = {};'.format(
+                    SEARCH_VECTOR.format(row='')
+                ),
+                'CREATE INDEX recipes_recipe_search_vector_gin '
+                'ON recipes_recipe USING gin (search_vector);',
+            ],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS recipes_recipe_search_vector_gin;',
+                'DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger '
+                'ON recipes_recipe;',
+                'DROP FUNCTION IF EXISTS '
+                'recipes_recipe_search_vector_update();',
+            ],
+        ),
+        VendorRunSQL(
+            'sqlite',
+            [
+                'CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5('
+                'name, text, '
+                "tokenize = 'unicode61 remove_diacritics 2');",
+                'INSERT INTO recipes_recipe_fts (rowid, name, text) '
+                'SELECT id, name, text FROM recipes_recipe;',
+            ],
+            reverse_sql='DROP TABLE IF EXISTS recipes_recipe_fts;',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-18 05:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time'], name='recipe_cooking_time_idx'),
+        ),
+    ]
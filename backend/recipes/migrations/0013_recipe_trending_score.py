@@ -0,0 +1,59 @@
+# Generated by Django 3.2.3 on 2026-10-18 05:55
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.utils.timezone
+
+
+def fill_added_at(apps, schema_editor):
+    # Дата добавления старых связей неизвестна. Дата публикации рецепта
+    # не позже неё и не выдаёт всю историю за свежую активность.
+    Recipe = apps.get_model('recipes', 'Recipe')
+    pub_date = Subquery(
+        Recipe.objects.filter(pk=OuterRef('recipe_id')).values('pub_date')
+    )
+    for model_name in ('Favorite', 'ShoppingCard'):
+        apps.get_model('recipes', model_name).objects.update(
+            added_at=pub_date
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_cooking_time_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='added_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='scores_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата пересчёта рейтинга'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, verbose_name='Трендовый рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcard',
+            name='added_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-in_carts_count', '-id'], name='recipe_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-id'], name='recipe_trending_idx'),
+        ),
+        migrations.RunPython(fill_added_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Sum
+import django.db.models.deletion
+
+
+def fill_cart_totals(apps, schema_editor):
+    ShoppingCard = apps.get_model('recipes', 'ShoppingCard')
+    ShoppingCartTotal = apps.get_model('recipes', 'ShoppingCartTotal')
+    rows = ShoppingCard.objects.filter(
+        recipe__recipeingredient__isnull=False
+    ).values(
+        'user_id',
+        ingredient_id=F('recipe__recipeingredient__ingredient_id'),
+    ).annotate(
+        total=Sum('recipe__recipeingredient__amount')
+    ).order_by()
+    ShoppingCartTotal.objects.bulk_create(
+        (
+            ShoppingCartTotal(user_id=row['user_id'],
+                              ingredient_id=row['ingredient_id'],
+                              total_amount=row['total'])
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0013_recipe_trending_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.IntegerField(default=0, verbose_name='Общее количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.ingredient')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Сумма списка покупок',
+                'verbose_name_plural': 'Суммы списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcarttotal',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_cart_total_user_ingredient'),
+        ),
+        migrations.RunPython(fill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -103,11 +104,65 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата добавления',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Кол-во добавлений в избранное',
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Кол-во добавлений в списки покупок',
+    )
+    trending_score = models.FloatField(
+        default=0,
+        verbose_name='Трендовый рейтинг',
+    )
+    scores_updated_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата пересчёта рейтинга',
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор',
+    )
+    fanned_out = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Разослан в ленты подписчиков',
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=['cooking_time'],
+                name='recipe_cooking_time_idx',
+            ),
+            models.Index(
+                fields=['-favorites_count', '-in_carts_count', '-id'],
+                name='recipe_popular_idx',
+            ),
+            models.Index(
+                fields=['-trending_score', '-id'],
+                name='recipe_trending_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                condition=models.Q(fanned_out=False),
+                name='recipe_pulled_feed_idx',
+            ),
+        ]
 
     def __str__(self):
         return str(self.name)[:SHORT_VIEW_LENGTH]
@@ -179,6 +234,11 @@ class Favorite(models.Model):
         Recipe,
         on_delete=models.CASCADE
     )
+    added_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         verbose_name = 'Избранное'
@@ -206,6 +266,11 @@ class ShoppingCard(models.Model):
         Recipe,
         on_delete=models.CASCADE
     )
+    added_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         verbose_name = 'Список покупок'
@@ -219,3 +284,71 @@ class ShoppingCard(models.Model):
 
     def __str__(self):
         return f'{self.user} -> {self.recipe}'
+
+
+class ShoppingCartTotal(models.Model):
+    """Модель сумм ингредиентов в списке покупок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_totals'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE
+    )
+    total_amount = models.IntegerField(
+        default=0,
+        verbose_name='Общее количество',
+    )
+
+    class Meta:
+        verbose_name = 'Сумма списка покупок'
+        verbose_name_plural = 'Суммы списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_cart_total_user_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.ingredient}: {self.total_amount}'
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации рецепта',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry_user_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_entry_user_pub_date_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} <- {self.recipe}'
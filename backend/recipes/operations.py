@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """RunSQL, который выполняется только на указанной СУБД."""
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        return name, (self.vendor, *args), kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
@@ -0,0 +1,96 @@
+from threading import Lock
+from time import monotonic
+
+from recipes.constants import (
+    INGREDIENTS_VERSION,
+    REGISTRY_CHECK_INTERVAL,
+    TAGS_VERSION,
+)
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.versions import get_version
+
+
+class ReferenceRegistry:
+    """
+    Строки справочной таблицы в памяти процесса.
+
+    Не чаще раза в REGISTRY_CHECK_INTERVAL секунд сверяет общую версию
+    набора данных и перечитывает таблицу, если версия изменилась.
+    """
+
+    def __init__(self, model, version_name):
+        self.model = model
+        self.version_name = version_name
+        self._lock = Lock()
+        self._version = None
+        self._checked_at = float('-inf')
+        self._objects = {}
+
+    def _refresh(self):
+        now = monotonic()
+        if now - self._checked_at < REGISTRY_CHECK_INTERVAL:
+            return
+        version = get_version(self.version_name)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._objects = {
+                        obj.pk: obj
+                        for obj in self.model.objects.order_by('pk')
+                    }
+                    self._version = version
+        self._checked_at = now
+
+    def invalidate(self):
+        """Сверить версию при следующем обращении."""
+        self._checked_at = float('-inf')
+
+    @property
+    def version(self):
+        self._refresh()
+        return self._version
+
+    def all(self):
+        self._refresh()
+        return list(self._objects.values())
+
+    def get(self, pk):
+        self._refresh()
+        return self._objects.get(pk)
+
+
+tags = ReferenceRegistry(Tag, TAGS_VERSION)
+ingredients = ReferenceRegistry(Ingredient, INGREDIENTS_VERSION)
+
+
+def recipe_tags(recipe_ids):
+    """
+    Теги рецептов из реестра: {id рецепта: [теги]}.
+
+    Читает только связующую таблицу, без join с таблицей тегов.
+    """
+    result = {recipe_id: [] for recipe_id in recipe_ids}
+    if not result:
+        return result
+    links = (
+        Recipe.tags.through.objects
+        .filter(recipe_id__in=result)
+        .order_by('pk')
+        .values_list('recipe_id', 'tag_id')
+    )
+    for recipe_id, tag_id in links:
+        tag = tags.get(tag_id)
+        if tag is None:
+            tag = Tag.objects.get(pk=tag_id)
+        result[recipe_id].append(tag)
+    return result
+
+
+def prefetch_tags(recipes):
+    """Подставляет рецептам теги из реестра."""
+    pending = {
+        recipe.pk: recipe for recipe in recipes
+        if not hasattr(recipe, 'registry_tags')
+    }
+    for recipe_id, recipe_tag_list in recipe_tags(pending).items():
+        pending[recipe_id].registry_tags = recipe_tag_list
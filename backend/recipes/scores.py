@@ -0,0 +1,80 @@
+from collections import defaultdict
+from math import log2
+
+from django.db import transaction
+from django.db.models import Max
+
+from recipes.constants import (
+    RECIPES_VERSION,
+    TRENDING_CART_WEIGHT,
+    TRENDING_EPOCH,
+    TRENDING_FAVORITE_WEIGHT,
+    TRENDING_HALF_LIFE,
+)
+from recipes.models import Favorite, Recipe, ShoppingCard
+from recipes.versions import bump_version
+
+TRENDING_EVENTS = (
+    (Favorite, TRENDING_FAVORITE_WEIGHT),
+    (ShoppingCard, TRENDING_CART_WEIGHT),
+)
+BATCH_SIZE = 1000
+
+
+def event_exponent(added_at, weight):
+    """log2 веса события, выросшего с TRENDING_EPOCH до `added_at`."""
+    return (
+        (added_at - TRENDING_EPOCH).total_seconds() / TRENDING_HALF_LIFE
+        + log2(weight)
+    )
+
+
+def add_events(score, exponents):
+    """
+    Добавляет события к трендовому рейтингу.
+
+    Рейтинг хранится как log2 суммы весов событий, каждый из которых
+    удваивается за TRENDING_HALF_LIFE с TRENDING_EPOCH. Так порядок
+    рецептов совпадает с порядком по затухающей сумме в любой момент,
+    и рецепты без новой активности не нужно пересчитывать. Ноль —
+    событий ещё не было.
+    """
+    values = [*exponents, *([score] if score else [])]
+    top = max(values)
+    return top + log2(sum(2 ** (value - top) for value in values))
+
+
+def update_trending_scores(until):
+    """
+    Учитывает в рейтинге события с прошлого пересчёта до `until`.
+
+    Затрагивает только рецепты с новыми событиями; возвращает их число.
+    """
+    since = Recipe.objects.aggregate(
+        since=Max('scores_updated_at')
+    )['since']
+    events = defaultdict(list)
+    for model, weight in TRENDING_EVENTS:
+        added = model.objects.filter(added_at__lt=until)
+        if since is not None:
+            added = added.filter(added_at__gte=since)
+        for recipe_id, added_at in added.values_list(
+                'recipe_id', 'added_at').iterator():
+            events[recipe_id].append(event_exponent(added_at, weight))
+    recipe_ids = list(events)
+    with transaction.atomic():
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            recipes = list(Recipe.objects.filter(
+                pk__in=recipe_ids[start:start + BATCH_SIZE]
+            ).only('id', 'trending_score'))
+            for recipe in recipes:
+                recipe.trending_score = add_events(
+                    recipe.trending_score, events[recipe.pk]
+                )
+                recipe.scores_updated_at = until
+            Recipe.objects.bulk_update(
+                recipes, ('trending_score', 'scores_updated_at')
+            )
+        if recipe_ids:
+            transaction.on_commit(lambda: bump_version(RECIPES_VERSION))
+    return len(recipe_ids)
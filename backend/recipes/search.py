@@ -0,0 +1,86 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+
+from recipes.constants import (
+    SEARCH_CONFIG,
+    SEARCH_NAME_WEIGHT,
+    SEARCH_TEXT_WEIGHT,
+)
+from recipes.models import Recipe
+
+FTS_TABLE = 'recipes_recipe_fts'
+WORD_RE = re.compile(r'\w+')
+
+
+def uses_fts():
+    """Поиск через таблицу FTS5 вместо tsvector (не PostgreSQL)."""
+    return connection.vendor == 'sqlite'
+
+
+def index_recipe(recipe):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe.pk]
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+            f'VALUES (%s, %s, %s)',
+            [recipe.pk, recipe.name, recipe.text]
+        )
+
+
+def index_recipes(recipes):
+    """Добавляет в FTS5 новые рецепты одной пачкой."""
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+            f'VALUES (%s, %s, %s)',
+            [(recipe.pk, recipe.name, recipe.text) for recipe in recipes]
+        )
+
+
+def unindex_recipe(recipe_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe_id]
+        )
+
+
+def fts_query(value):
+    """Запрос FTS5: все слова запроса, каждое — как начало слова."""
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(value))
+
+
+def search_recipes(queryset, value):
+    """
+    Рецепты, подходящие под поисковый запрос, лучшие первыми.
+
+    На PostgreSQL ищет по хранимому tsvector с русской морфологией
+    (индекс GIN, вектор поддерживает триггер), на SQLite — по таблице
+    FTS5 с совпадением по началу слов. Ранг — в аннотации `search_rank`.
+    """
+    if not uses_fts():
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+    else:
+        match = fts_query(value)
+        if not match:
+            return queryset.none()
+        queryset = queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,)
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, %s, %s) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = {Recipe._meta.db_table}.id',
+            (SEARCH_NAME_WEIGHT, SEARCH_TEXT_WEIGHT, match)
+        ))
+    return queryset.order_by('-search_rank', '-pub_date', '-id')
@@ -0,0 +1,79 @@
+import random
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from recipes.constants import RECIPES_VERSION
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag, User
+from recipes.search import index_recipes, uses_fts
+from recipes.versions import bump_version
+
+BATCH_SIZE = 10000
+BENCHMARK_AUTHOR = 'benchmark'
+RECIPE_INGREDIENTS = (5, 15)
+
+
+def seed_recipes(total, link_batch=None):
+    """
+    Досоздаёт синтетические рецепты, пока их не станет `total`.
+
+    Рецепты пишутся через bulk_create, поэтому то, что иначе делают
+    сигналы, выполняется здесь же: счётчик рецептов автора, поисковый
+    индекс FTS5 и поколение кэша списков. `link_batch(recipes)` создаёт
+    связи новой пачки рецептов. Возвращает число созданных рецептов.
+    """
+    missing = total - Recipe.objects.count()
+    if missing <= 0:
+        return 0
+    author, _ = User.objects.get_or_create(
+        username=BENCHMARK_AUTHOR,
+        defaults={'email': f'{BENCHMARK_AUTHOR}@foodgram.ru'},
+    )
+    created = 0
+    while created < missing:
+        size = min(BATCH_SIZE, missing - created)
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create(
+                Recipe(author=author, name=f'Рецепт {created + i}',
+                       text='Описание', cooking_time=random.randint(1, 240))
+                for i in range(size)
+            )
+            if not connection.features.can_return_rows_from_bulk_insert:
+                recipes = list(Recipe.objects.order_by('-pk')[:size])
+            if link_batch is not None:
+                link_batch(recipes)
+            if uses_fts():
+                index_recipes(recipes)
+        created += size
+    User.objects.filter(pk=author.pk).update(
+        recipes_count=F('recipes_count') + created
+    )
+    bump_version(RECIPES_VERSION)
+    return created
+
+
+def link_random_tags(recipes):
+    """Каждому рецепту — случайный непустой набор тегов."""
+    tag_ids = list(Tag.objects.values_list('pk', flat=True))
+    if not tag_ids:
+        return
+    links = Recipe.tags.through
+    links.objects.bulk_create(
+        links(recipe_id=recipe.pk, tag_id=tag_id)
+        for recipe in recipes
+        for tag_id in random.sample(tag_ids, random.randint(1, len(tag_ids)))
+    )
+
+
+def link_random_ingredients(recipes):
+    """Каждому рецепту — от 5 до 15 случайных ингредиентов."""
+    ingredient_ids = list(Ingredient.objects.values_list('pk', flat=True))
+    low, high = RECIPE_INGREDIENTS
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe_id=recipe.pk, ingredient_id=pk,
+                         amount=random.randint(1, 500))
+        for recipe in recipes
+        for pk in random.sample(
+            ingredient_ids, min(random.randint(low, high), len(ingredient_ids))
+        )
+    )
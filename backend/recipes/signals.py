@@ -0,0 +1,182 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from recipes.constants import (
+    AUTHORS_VERSION,
+    RECIPE_VERSION,
+    RECIPES_VERSION,
+    USER_FLAGS_VERSION,
+)
+from recipes.carts import change_cart_totals, recipe_amounts
+from recipes.counters import COUNTERS, change_counters
+from recipes.feed import backfill_feed, trim_feed
+from recipes.models import (
+    Favorite,
+    Follow,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCard,
+    Tag,
+    User,
+)
+from recipes.registry import ingredients, tags
+from recipes.search import index_recipe, unindex_recipe, uses_fts
+from recipes.versions import bump_version
+
+
+def reference_data_changed(registry):
+    transaction.on_commit(partial(bump_version, registry.version_name))
+    transaction.on_commit(registry.invalidate)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(sender, **kwargs):
+    reference_data_changed(ingredients)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(sender, **kwargs):
+    reference_data_changed(tags)
+
+
+def counted_object_saved(sender, instance, created, **kwargs):
+    if created:
+        change_counters(sender, [instance], 1)
+
+
+def counted_object_deleted(sender, instance, **kwargs):
+    change_counters(sender, [instance], -1)
+
+
+for counted_model in {model for model, _, _ in COUNTERS}:
+    post_save.connect(counted_object_saved, sender=counted_model)
+    post_delete.connect(counted_object_deleted, sender=counted_model)
+
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def recipes_changed(*recipe_ids):
+    """Сдвигает поколения кэша списка рецептов и изменённых рецептов."""
+    def bump():
+        bump_version(RECIPES_VERSION)
+        for recipe_id in recipe_ids:
+            bump_version(RECIPE_VERSION.format(recipe_id))
+    transaction.on_commit(bump)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    recipes_changed(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_saved(sender, instance, update_fields, **kwargs):
+    if not uses_fts() or (
+            update_fields and not {'name', 'text'} & update_fields):
+        return
+    index_recipe(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_deleted(sender, instance, **kwargs):
+    if uses_fts():
+        unindex_recipe(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    recipes_changed(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # В post_clear у тега уже нет рецептов, а pk_set равен None.
+        instance._cleared_recipe_ids = list(
+            sender.objects.filter(tag=instance)
+                          .values_list('recipe_id', flat=True)
+        )
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recipes_changed(instance.pk)
+    elif action == 'post_clear':
+        recipes_changed(*instance.__dict__.pop('_cleared_recipe_ids', ()))
+    else:
+        recipes_changed(*(pk_set or ()))
+
+
+def author_state(user):
+    """Загруженные значения полей автора; отложенные поля не читаются."""
+    return {field: user.__dict__.get(field) for field in AUTHOR_FIELDS}
+
+
+@receiver(post_init, sender=User)
+def remember_author_state(sender, instance, **kwargs):
+    instance._author_state = author_state(instance)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    """
+    Сдвигает поколение авторов, только если поменялись поля автора:
+    сохранения пароля, last_login и счётчиков кэш рецептов не трогают.
+    """
+    state = author_state(instance)
+    changed = state != instance._author_state
+    instance._author_state = state
+    if created or not changed or (
+            update_fields and not AUTHOR_FIELDS & update_fields):
+        return
+    transaction.on_commit(partial(bump_version, AUTHORS_VERSION))
+
+
+@receiver(post_save, sender=ShoppingCard)
+def cart_recipe_added(sender, instance, created, **kwargs):
+    if created:
+        change_cart_totals(
+            [instance.user_id], recipe_amounts(instance.recipe_id)
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCard)
+def cart_recipe_removed(sender, instance, **kwargs):
+    """
+    До удаления: при удалении рецепта его ингредиенты удаляются тем же
+    каскадом, и после него вычитать было бы нечего.
+    """
+    amounts = recipe_amounts(instance.recipe_id)
+    change_cart_totals(
+        [instance.user_id], {pk: -amount for pk, amount in amounts.items()}
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        backfill_feed(instance.user_id, [instance.following_id])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    trim_feed(instance.user_id, [instance.following_id])
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCard)
+@receiver((post_save, post_delete), sender=Follow)
+def user_flags_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        bump_version, USER_FLAGS_VERSION.format(instance.user_id)
+    ))
@@ -0,0 +1,96 @@
+from itertools import groupby
+
+MASS = 'mass'
+VOLUME = 'volume'
+
+# Единица измерения: (величина, множитель к г или мл).
+UNITS = {
+    'г': (MASS, 1),
+    'кг': (MASS, 1000),
+    'мл': (VOLUME, 1),
+    'л': (VOLUME, 1000),
+    'капля': (VOLUME, 0.05),
+    'ч. л.': (VOLUME, 5),
+    'ст. л.': (VOLUME, 15),
+    'стакан': (VOLUME, 250),
+}
+
+# Единицы для суммы, от крупной к мелкой.
+DISPLAY_UNITS = {
+    MASS: (('кг', 1000), ('г', 1)),
+    VOLUME: (('л', 1000), ('мл', 1)),
+}
+
+# Плотность, г в 1 мл.
+DENSITIES = {
+    'вода': 1.0,
+    'молоко': 1.03,
+    'кефир': 1.03,
+    'сливки': 1.0,
+    'сметана': 1.0,
+    'мед': 1.4,
+    'мука': 0.6,
+    'сахар': 0.8,
+    'сахарная пудра': 0.55,
+    'соль': 1.2,
+    'крахмал': 0.65,
+    'рис': 0.8,
+    'пекарский порошок': 0.9,
+    'уксус': 1.0,
+    'соевый соус': 1.2,
+    'масло растительное': 0.92,
+}
+
+AMOUNT_PRECISION = 3
+
+
+def display_amount(total, dimension):
+    """Сумма в г или мл -> (количество, единица) в удобной единице."""
+    for unit, factor in DISPLAY_UNITS[dimension]:
+        if total >= factor:
+            break
+    amount = round(total / factor, AMOUNT_PRECISION)
+    return (int(amount) if amount == int(amount) else amount), unit
+
+
+def merge_units(name, lines):
+    """
+    Сводит строки одного ингредиента в разных единицах.
+
+    Массу и объём складывает в г и мл, объём переводит в массу, если
+    известна плотность и есть обе величины. Строки в единицах без
+    пересчёта и единственная единица величины остаются как есть.
+    """
+    by_dimension = {}
+    result = []
+    for amount, unit in lines:
+        dimension = UNITS.get(unit, (None,))[0]
+        if dimension is None:
+            result.append((amount, unit))
+        else:
+            by_dimension.setdefault(dimension, []).append((amount, unit))
+    if MASS in by_dimension and VOLUME in by_dimension and name in DENSITIES:
+        by_dimension[MASS] += [
+            (amount * UNITS[unit][1] * DENSITIES[name], 'г')
+            for amount, unit in by_dimension.pop(VOLUME)
+        ]
+    merged = []
+    for dimension, dimension_lines in by_dimension.items():
+        if len(dimension_lines) == 1:
+            merged.append(dimension_lines[0])
+            continue
+        merged.append(display_amount(sum(
+            amount * UNITS[unit][1] for amount, unit in dimension_lines
+        ), dimension))
+    return merged + result
+
+
+def normalize_shopping_list(rows):
+    """
+    Сводит строки (название, количество, единица), упорядоченные по
+    названию, за один проход; в памяти только строки одного ингредиента.
+    """
+    for name, group in groupby(rows, key=lambda row: row[0]):
+        lines = [(amount, unit) for _, amount, unit in group]
+        for amount, unit in merge_units(name, lines):
+            yield name, amount, unit
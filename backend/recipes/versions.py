@@ -0,0 +1,35 @@
+from time import time_ns
+
+from django.core.cache import cache
+
+VERSION_KEY_TEMPLATE = 'version:{}'
+
+
+def initial_version():
+    """
+    Начальная версия: время в микросекундах.
+
+    После вытеснения ключа версия начинается заново с большего числа и
+    не совпадает с версиями, из которых строились старые ключи кэша.
+    """
+    return time_ns() // 1000
+
+
+def get_version(name):
+    """Текущая версия набора данных `name`."""
+    key = VERSION_KEY_TEMPLATE.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Сдвигает версию набора данных, сообщая об изменении всем воркерам."""
+    key = VERSION_KEY_TEMPLATE.format(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, initial_version(), None)
+        return cache.incr(key)
@@ -0,0 +1,98 @@
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.registry import ingredients, tags
+from tests.utils import PNG
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(settings, tmp_path):
+    """Чистый кэш и реестры в каждом тесте, медиа во временной папке."""
+    settings.MEDIA_ROOT = tmp_path
+    cache.clear()
+    tags.invalidate()
+    ingredients.invalidate()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='user', email='user@example.com', password='password'
+    )
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        username='author', email='author@example.com', password='password'
+    )
+
+
+@pytest.fixture
+def admin_user(django_user_model):
+    return django_user_model.objects.create_superuser(
+        username='admin', email='admin@example.com', password='password'
+    )
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def author_client(author):
+    client = APIClient()
+    client.force_authenticate(author)
+    return client
+
+
+@pytest.fixture
+def tag(db):
+    return Tag.objects.create(
+        name='Завтрак', color='#E26C2D', slug='breakfast'
+    )
+
+
+@pytest.fixture
+def ingredient_list(db):
+    return [
+        Ingredient.objects.create(
+            name=f'Ингредиент {index}', measurement_unit='г'
+        )
+        for index in range(5)
+    ]
+
+
+@pytest.fixture
+def make_recipe(author, tag, ingredient_list):
+    """Фабрика рецептов: по умолчанию автор `author`, все ингредиенты."""
+    def make(recipe_author=None, name='Рецепт', amount=10,
+             recipe_ingredients=None):
+        recipe = Recipe.objects.create(
+            author=recipe_author or author,
+            name=name,
+            text='Описание рецепта',
+            cooking_time=10,
+            image=SimpleUploadedFile('recipe.png', PNG, 'image/png'),
+        )
+        recipe.tags.add(tag)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=amount)
+            for ingredient in recipe_ingredients or ingredient_list
+        )
+        return recipe
+    return make
@@ -0,0 +1,55 @@
+import pytest
+from django.test import Client
+
+from recipes.models import Favorite, Follow, ShoppingCard
+
+CHANGELISTS = (
+    '/admin/recipes/recipe/',
+    '/admin/recipes/ingredient/',
+    '/admin/recipes/recipeingredient/',
+    '/admin/recipes/follow/',
+    '/admin/recipes/favorite/',
+    '/admin/recipes/shoppingcard/',
+    '/admin/users/customuser/',
+)
+MAX_CHANGELIST_QUERIES = 10
+
+
+@pytest.fixture
+def admin_client(admin_user):
+    client = Client()
+    client.force_login(admin_user)
+    return client
+
+
+@pytest.fixture
+def fill(make_recipe, django_user_model):
+    """Добавляет `size` читателей со своими рецептами и связями."""
+    def fill(size):
+        start = django_user_model.objects.count()
+        readers = [
+            django_user_model.objects.create_user(
+                username=f'reader{index}',
+                email=f'reader{index}@example.com',
+            )
+            for index in range(start, start + size)
+        ]
+        for index, reader in enumerate(readers):
+            recipe = make_recipe(recipe_author=reader, name=f'Рецепт {index}')
+            Favorite.objects.create(user=reader, recipe=recipe)
+            ShoppingCard.objects.create(user=reader, recipe=recipe)
+            Follow.objects.create(user=reader, following=readers[index - 1])
+    return fill
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', CHANGELISTS)
+def test_changelist_query_count_does_not_depend_on_rows(
+    url, admin_client, fill, django_assert_max_num_queries
+):
+    fill(2)
+    with django_assert_max_num_queries(MAX_CHANGELIST_QUERIES) as few_rows:
+        assert admin_client.get(url).status_code == 200
+    fill(30)
+    with django_assert_max_num_queries(len(few_rows.captured_queries)):
+        assert admin_client.get(url).status_code == 200
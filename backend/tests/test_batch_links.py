@@ -0,0 +1,126 @@
+from unittest import mock
+
+import pytest
+
+from recipes import links
+from recipes.carts import check_cart_totals
+from recipes.counters import reconcile_counters
+from recipes.models import Favorite, FeedEntry, Follow, ShoppingCard
+
+CART_BATCH_URL = '/api/recipes/shopping_cart/batch/'
+
+
+def statuses(response):
+    return [
+        (item['id'], item['status']) for item in response.json()['results']
+    ]
+
+
+def assert_consistent():
+    """Счётчики и суммы списков покупок совпадают с пересчётом."""
+    assert not any(reconcile_counters().values())
+    assert check_cart_totals() == 0
+
+
+@pytest.mark.django_db
+def test_cart_batch_reports_each_id(user, user_client, make_recipe):
+    first, second = make_recipe(), make_recipe()
+    ShoppingCard.objects.create(user=user, recipe=first)
+    response = user_client.post(
+        CART_BATCH_URL,
+        {'ids': [first.pk, second.pk, second.pk, 999]},
+        format='json',
+    )
+    assert response.status_code == 200
+    assert statuses(response) == [
+        (first.pk, links.EXISTS),
+        (second.pk, links.CREATED),
+        (999, links.NOT_FOUND),
+    ]
+    second.refresh_from_db()
+    assert second.in_carts_count == 1
+    assert_consistent()
+    response = user_client.delete(
+        CART_BATCH_URL, {'ids': [first.pk, second.pk, 999]}, format='json'
+    )
+    assert statuses(response) == [
+        (first.pk, links.DELETED),
+        (second.pk, links.DELETED),
+        (999, links.NOT_FOUND),
+    ]
+    assert not ShoppingCard.objects.filter(user=user).exists()
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_batch_add_counts_only_inserted_links(user, user_client, make_recipe):
+    """Связь, появившаяся после проверки, не считается дважды."""
+    first, second = make_recipe(), make_recipe()
+    stale_states = {first.pk: False, second.pk: False}
+
+    def link_states(model, field, user, ids):
+        ShoppingCard.objects.get_or_create(user=user, recipe=first)
+        return stale_states
+
+    with mock.patch.object(links, 'link_states', link_states):
+        response = user_client.post(
+            CART_BATCH_URL, {'ids': [first.pk, second.pk]}, format='json'
+        )
+    assert statuses(response) == [
+        (first.pk, links.EXISTS),
+        (second.pk, links.CREATED),
+    ]
+    first.refresh_from_db()
+    assert first.in_carts_count == 1
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_batch_remove_counts_only_deleted_links(user, user_client,
+                                                make_recipe):
+    """Связь, удалённая после проверки, не вычитается дважды."""
+    first, second = make_recipe(), make_recipe()
+    Favorite.objects.create(user=user, recipe=first)
+    Favorite.objects.create(user=user, recipe=second)
+
+    def link_states(model, field, user, ids):
+        Favorite.objects.filter(user=user, recipe=first).delete()
+        return {first.pk: True, second.pk: True}
+
+    with mock.patch.object(links, 'link_states', link_states):
+        response = user_client.delete(
+            '/api/recipes/favorite/batch/',
+            {'ids': [first.pk, second.pk]},
+            format='json',
+        )
+    assert statuses(response) == [
+        (first.pk, links.ABSENT),
+        (second.pk, links.DELETED),
+    ]
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_subscribe_batch_fills_and_trims_feed(user, author, user_client,
+                                              make_recipe):
+    recipe = make_recipe()
+    recipe.fanned_out = True
+    recipe.save()
+    response = user_client.post(
+        '/api/users/subscribe/batch/',
+        {'ids': [author.pk, user.pk]},
+        format='json',
+    )
+    assert statuses(response) == [
+        (author.pk, links.CREATED),
+        (user.pk, links.FORBIDDEN),
+    ]
+    assert Follow.objects.filter(user=user, following=author).exists()
+    assert list(
+        FeedEntry.objects.filter(user=user).values_list('recipe', flat=True)
+    ) == [recipe.pk]
+    user_client.delete(
+        '/api/users/subscribe/batch/', {'ids': [author.pk]}, format='json'
+    )
+    assert not FeedEntry.objects.filter(user=user).exists()
+    assert_consistent()
@@ -0,0 +1,41 @@
+import pytest
+
+from recipes.constants import AUTHORS_VERSION, RECIPE_VERSION
+from recipes.versions import get_version
+
+
+@pytest.mark.django_db
+def test_password_and_login_saves_keep_author_generation(
+    author, django_capture_on_commit_callbacks
+):
+    version = get_version(AUTHORS_VERSION)
+    with django_capture_on_commit_callbacks(execute=True):
+        author.set_password('new-password')
+        author.save()
+        author.save(update_fields=['last_login'])
+    assert get_version(AUTHORS_VERSION) == version
+
+
+@pytest.mark.django_db
+def test_author_field_change_bumps_author_generation(
+    author, django_capture_on_commit_callbacks
+):
+    version = get_version(AUTHORS_VERSION)
+    with django_capture_on_commit_callbacks(execute=True):
+        author.first_name = 'Новое имя'
+        author.save()
+    assert get_version(AUTHORS_VERSION) > version
+
+
+@pytest.mark.django_db
+def test_clearing_tag_recipes_bumps_recipe_generations(
+    tag, make_recipe, django_capture_on_commit_callbacks
+):
+    recipes = [make_recipe(), make_recipe()]
+    versions = [get_version(RECIPE_VERSION.format(r.pk)) for r in recipes]
+    with django_capture_on_commit_callbacks(execute=True):
+        tag.recipes.clear()
+    assert all(
+        get_version(RECIPE_VERSION.format(recipe.pk)) > version
+        for recipe, version in zip(recipes, versions)
+    )
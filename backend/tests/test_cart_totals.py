@@ -0,0 +1,82 @@
+import pytest
+
+from recipes.carts import check_cart_totals
+from recipes.models import ShoppingCartTotal
+from tests.utils import recipe_payload
+
+
+def cart_totals(user):
+    return dict(
+        ShoppingCartTotal.objects.filter(user=user)
+                                 .values_list('ingredient_id', 'total_amount')
+    )
+
+
+def summary_amounts(client):
+    response = client.get('/api/recipes/shopping_cart_summary/')
+    return [row['amount'] for row in response.json()['ingredients']]
+
+
+@pytest.mark.django_db
+def test_cart_totals_follow_added_and_removed_recipes(
+    user, user_client, make_recipe, ingredient_list
+):
+    first, second, *_ = ingredient_list
+    soup = make_recipe(amount=3, recipe_ingredients=[first, second])
+    salad = make_recipe(amount=5, recipe_ingredients=[first])
+    user_client.post(f'/api/recipes/{soup.pk}/shopping_cart/')
+    user_client.post(f'/api/recipes/{salad.pk}/shopping_cart/')
+    assert cart_totals(user) == {first.pk: 8, second.pk: 3}
+    user_client.delete(f'/api/recipes/{soup.pk}/shopping_cart/')
+    assert cart_totals(user) == {first.pk: 5}
+    user_client.delete(f'/api/recipes/{salad.pk}/shopping_cart/')
+    assert cart_totals(user) == {}
+    assert check_cart_totals() == 0
+
+
+@pytest.mark.django_db
+def test_cart_totals_follow_recipe_changes(
+    user, user_client, author_client, make_recipe, ingredient_list, tag
+):
+    first, second, third, *_ = ingredient_list
+    recipe = make_recipe(amount=3, recipe_ingredients=[first, second])
+    user_client.post(f'/api/recipes/{recipe.pk}/shopping_cart/')
+    response = author_client.patch(
+        f'/api/recipes/{recipe.pk}/',
+        recipe_payload([second, third], tag, amount=7),
+        format='json',
+    )
+    assert response.status_code == 200, response.content
+    assert cart_totals(user) == {second.pk: 7, third.pk: 7}
+    author_client.delete(f'/api/recipes/{recipe.pk}/')
+    assert cart_totals(user) == {}
+    assert check_cart_totals() == 0
+
+
+@pytest.mark.django_db
+def test_check_cart_totals_fixes_drift(user, user_client, make_recipe,
+                                       ingredient_list):
+    first, second, *_ = ingredient_list
+    recipe = make_recipe(amount=3, recipe_ingredients=[first, second])
+    user_client.post(f'/api/recipes/{recipe.pk}/shopping_cart/')
+    ShoppingCartTotal.objects.filter(ingredient=first).update(total_amount=1)
+    ShoppingCartTotal.objects.filter(ingredient=second).delete()
+    assert check_cart_totals() == 2
+    assert check_cart_totals(fix=True) == 2
+    assert cart_totals(user) == {first.pk: 3, second.pk: 3}
+    assert check_cart_totals() == 0
+
+
+@pytest.mark.django_db
+def test_fixed_cart_totals_are_not_served_from_cache(
+    user, user_client, make_recipe, ingredient_list,
+    django_capture_on_commit_callbacks
+):
+    first, *_ = ingredient_list
+    recipe = make_recipe(amount=3, recipe_ingredients=[first])
+    user_client.post(f'/api/recipes/{recipe.pk}/shopping_cart/')
+    ShoppingCartTotal.objects.filter(ingredient=first).update(total_amount=1)
+    assert summary_amounts(user_client) == [1]
+    with django_capture_on_commit_callbacks(execute=True):
+        assert check_cart_totals(fix=True) == 1
+    assert summary_amounts(user_client) == [3]
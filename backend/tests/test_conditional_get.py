@@ -0,0 +1,42 @@
+import pytest
+from django.utils.http import http_date
+
+from recipes.registry import tags
+
+
+@pytest.mark.django_db
+def test_recipe_detail_is_revalidated_after_tag_rename(
+    client, make_recipe, tag, django_capture_on_commit_callbacks
+):
+    recipe = make_recipe()
+    url = f'/api/recipes/{recipe.pk}/'
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'ETag' in response
+    assert 'Last-Modified' not in response
+    with django_capture_on_commit_callbacks(execute=True):
+        tag.name = 'Обед'
+        tag.save()
+    tags.invalidate()
+    response = client.get(
+        url, HTTP_IF_MODIFIED_SINCE=http_date(recipe.updated_at.timestamp())
+    )
+    assert response.status_code == 200
+    assert response.json()['tags'][0]['name'] == 'Обед'
+
+
+@pytest.mark.django_db
+def test_recipe_detail_etag_changes_with_tag_rename(
+    client, make_recipe, tag, django_capture_on_commit_callbacks
+):
+    recipe = make_recipe()
+    url = f'/api/recipes/{recipe.pk}/'
+    etag = client.get(url)['ETag']
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    with django_capture_on_commit_callbacks(execute=True):
+        tag.name = 'Обед'
+        tag.save()
+    tags.invalidate()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
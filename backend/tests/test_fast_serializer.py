@@ -0,0 +1,87 @@
+import pytest
+from django.db.models import Prefetch, Value
+from rest_framework.renderers import JSONRenderer
+
+from api.fast import FastRecipeSerializer
+from api.serializers import RecipeSerializer
+from recipes.constants import RECIPE_FIELDS
+from recipes.models import Ingredient, Recipe, Tag, User
+from recipes.registry import ingredients
+
+PROJECTIONS = (
+    None,
+    ('id', 'name'),
+    ('author', 'tags'),
+    ('ingredients', 'cooking_time'),
+    ('image', 'text', 'is_favorited', 'is_in_shopping_cart'),
+)
+
+
+def recipes_queryset():
+    return Recipe.objects.order_by('-pub_date', '-id').annotate(
+        is_favorited=Value(False),
+        is_in_shopping_cart=Value(False),
+    )
+
+
+def drf_json(fields=None):
+    recipes = recipes_queryset().prefetch_related(
+        Prefetch('author', queryset=User.objects.annotate(
+            is_subscribed=Value(False)
+        )),
+        'recipeingredient_set',
+    )
+    return JSONRenderer().render(
+        RecipeSerializer(recipes, many=True, fields=fields).data
+    )
+
+
+def fast_json(fields=None):
+    serializer = FastRecipeSerializer(fields)
+    return JSONRenderer().render(
+        serializer.serialize(serializer.get_rows(recipes_queryset()))
+    )
+
+
+@pytest.fixture
+def recipes(make_recipe, user, tag, ingredient_list):
+    second_tag = Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+    first = make_recipe(name='Первый', amount=5)
+    second = make_recipe(
+        recipe_author=user, name='Второй', amount=7,
+        recipe_ingredients=ingredient_list[:2],
+    )
+    second.tags.add(second_tag)
+    make_recipe(name='Третий', recipe_ingredients=ingredient_list[3:])
+    return [first, second]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fields', PROJECTIONS)
+def test_fast_serializer_matches_recipe_serializer(recipes, fields):
+    assert fast_json(fields) == drf_json(fields)
+
+
+@pytest.mark.django_db
+def test_fast_serializer_covers_every_recipe_field(recipes):
+    serializer = FastRecipeSerializer()
+    assert serializer.fields == RECIPE_FIELDS
+    data = serializer.serialize(serializer.get_rows(recipes_queryset()))
+    assert all(tuple(recipe) == RECIPE_FIELDS for recipe in data)
+
+
+@pytest.mark.django_db
+def test_fast_serializer_matches_for_ingredients_missing_in_registry(
+    make_recipe
+):
+    ingredients.all()
+    fresh = Ingredient.objects.create(name='Новый продукт',
+                                      measurement_unit='шт')
+    make_recipe(recipe_ingredients=[fresh])
+    assert ingredients.get(fresh.pk) is None
+    assert fast_json() == drf_json()
+
+
+@pytest.mark.django_db
+def test_fast_serializer_handles_empty_rows():
+    assert fast_json() == drf_json() == b'[]'
@@ -0,0 +1,101 @@
+import pytest
+
+from recipes import feed
+from recipes.models import FeedEntry, Follow, Recipe
+from tests.utils import recipe_payload
+
+FEED_URL = '/api/recipes/feed/'
+
+
+@pytest.fixture
+def follower(user, author):
+    Follow.objects.create(user=user, following=author)
+    return user
+
+
+@pytest.fixture
+def create_recipe(author_client, ingredient_list, tag,
+                  django_capture_on_commit_callbacks):
+    """Создаёт рецепт через API и выполняет отложенную рассылку."""
+    def create():
+        with django_capture_on_commit_callbacks(execute=True):
+            response = author_client.post(
+                '/api/recipes/', recipe_payload(ingredient_list, tag),
+                format='json',
+            )
+        assert response.status_code == 201, response.content
+        return Recipe.objects.get(pk=response.json()['id'])
+    return create
+
+
+def feed_ids(response):
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+@pytest.mark.django_db
+def test_new_recipe_is_fanned_out_to_followers(follower, user_client,
+                                               create_recipe):
+    recipe = create_recipe()
+    assert recipe.fanned_out
+    assert list(
+        FeedEntry.objects.values_list('user_id', 'recipe_id')
+    ) == [(follower.pk, recipe.pk)]
+    assert feed_ids(user_client.get(FEED_URL)) == [recipe.pk]
+
+
+@pytest.mark.django_db
+def test_fan_out_waits_for_commit(follower, author_client, ingredient_list,
+                                  tag, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks:
+        author_client.post(
+            '/api/recipes/', recipe_payload(ingredient_list, tag),
+            format='json',
+        )
+    assert not FeedEntry.objects.exists()
+    assert len(callbacks) >= 1
+
+
+@pytest.mark.django_db
+def test_popular_author_recipes_are_pulled(monkeypatch, follower, author,
+                                           user_client, create_recipe):
+    # У `author` из запроса счётчик подписчиков устарел: решение о
+    # рассылке принимается по значению из базы.
+    assert author.followers_count == 0
+    monkeypatch.setattr(feed, 'FEED_FANOUT_MAX_FOLLOWERS', 0)
+    recipe = create_recipe()
+    assert not recipe.fanned_out
+    assert not FeedEntry.objects.exists()
+    assert feed_ids(user_client.get(FEED_URL)) == [recipe.pk]
+
+
+@pytest.mark.django_db
+def test_feed_cursor_merges_pushed_and_pulled(monkeypatch, follower,
+                                              user_client, create_recipe):
+    pushed = [create_recipe(), create_recipe()]
+    monkeypatch.setattr(feed, 'FEED_FANOUT_MAX_FOLLOWERS', 0)
+    pulled = [create_recipe(), create_recipe()]
+    expected = [recipe.pk for recipe in reversed(pushed + pulled)]
+    ids = []
+    url = f'{FEED_URL}?limit=3'
+    while url:
+        response = user_client.get(url)
+        assert response.status_code == 200
+        ids += feed_ids(response)
+        url = response.json()['next']
+    assert ids == expected
+
+
+@pytest.mark.django_db
+def test_subscribe_backfills_and_unsubscribe_trims_feed(
+    user, author, user_client, create_recipe
+):
+    recipe = create_recipe()
+    assert not FeedEntry.objects.exists()
+    response = user_client.post(f'/api/users/{author.pk}/subscribe/')
+    assert response.status_code == 201, response.content
+    assert list(
+        FeedEntry.objects.filter(user=user).values_list('recipe', flat=True)
+    ) == [recipe.pk]
+    user_client.delete(f'/api/users/{author.pk}/subscribe/')
+    assert not FeedEntry.objects.filter(user=user).exists()
+    assert feed_ids(user_client.get(FEED_URL)) == []
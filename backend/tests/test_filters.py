@@ -0,0 +1,56 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_have_ranks_recipes_by_pantry_coverage(
+    client, make_recipe, ingredient_list
+):
+    first, second, third, *_ = ingredient_list
+    half = make_recipe(name='Половина', recipe_ingredients=[first, second])
+    full = make_recipe(name='Всё есть', recipe_ingredients=[first])
+    make_recipe(name='Ничего нет', recipe_ingredients=[third])
+    response = client.get(f'/api/recipes/?have={first.pk}')
+    assert response.status_code == 200
+    assert [recipe['id'] for recipe in response.json()['results']] == [
+        full.pk, half.pk
+    ]
+
+
+@pytest.mark.django_db
+def test_exclude_drops_recipes_with_allergens(
+    client, make_recipe, ingredient_list
+):
+    first, second, *_ = ingredient_list
+    make_recipe(recipe_ingredients=[first, second])
+    safe = make_recipe(recipe_ingredients=[first])
+    response = client.get(f'/api/recipes/?exclude={second.pk}')
+    assert [recipe['id'] for recipe in response.json()['results']] == [
+        safe.pk
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('param', ('have', 'exclude'))
+def test_ingredient_ids_must_be_integers(client, param):
+    response = client.get(f'/api/recipes/?{param}=1.5')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_popular_ordering_follows_new_favorites(
+    client, user_client, make_recipe, django_capture_on_commit_callbacks
+):
+    older = make_recipe(name='Старый')
+    newer = make_recipe(name='Новый')
+    url = '/api/recipes/?ordering=popular'
+    response = client.get(url)
+    assert [recipe['id'] for recipe in response.json()['results']] == [
+        newer.pk, older.pk
+    ]
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(f'/api/recipes/{older.pk}/favorite/')
+    assert response.status_code == 201
+    response = client.get(url)
+    assert [recipe['id'] for recipe in response.json()['results']] == [
+        older.pk, newer.pk
+    ]
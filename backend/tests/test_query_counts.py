@@ -0,0 +1,85 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.constants import RECIPE_VERSION, RECIPES_VERSION
+from recipes.models import Recipe
+from recipes.versions import bump_version
+from tests.utils import recipe_payload
+
+
+def count_queries(request):
+    """Запросы к БД без кэша ответов, после прогрева реестров."""
+    request()
+    bump_version(RECIPES_VERSION)
+    for pk in Recipe.objects.values_list('pk', flat=True):
+        bump_version(RECIPE_VERSION.format(pk))
+    with CaptureQueriesContext(connection) as context:
+        response = request()
+    assert response.status_code < 300, response.content
+    return len(context.captured_queries)
+
+
+# Потолки с запасом под различия СУБД; главное — равенство при разном
+# числе рецептов и ингредиентов.
+MAX_LIST_QUERIES = 6
+MAX_DETAIL_QUERIES = 6
+MAX_CREATE_QUERIES = 18
+MAX_UPDATE_QUERIES = 24
+
+
+@pytest.mark.django_db
+def test_recipe_list_query_count_is_constant(
+    user_client, make_recipe, ingredient_list
+):
+    make_recipe(recipe_ingredients=ingredient_list[:1])
+    few = count_queries(lambda: user_client.get('/api/recipes/'))
+    for _ in range(8):
+        make_recipe()
+    many = count_queries(lambda: user_client.get('/api/recipes/'))
+    assert few == many <= MAX_LIST_QUERIES
+
+
+@pytest.mark.django_db
+def test_recipe_detail_query_count_is_constant(
+    user_client, make_recipe, ingredient_list
+):
+    counts = [
+        count_queries(lambda: user_client.get(f'/api/recipes/{recipe.pk}/'))
+        for recipe in (
+            make_recipe(recipe_ingredients=ingredient_list[:1]),
+            make_recipe(recipe_ingredients=ingredient_list),
+        )
+    ]
+    assert counts[0] == counts[1] <= MAX_DETAIL_QUERIES
+
+
+@pytest.mark.django_db
+def test_recipe_create_query_count_is_constant(
+    author_client, ingredient_list, tag
+):
+    counts = [
+        count_queries(lambda: author_client.post(
+            '/api/recipes/',
+            recipe_payload(ingredient_list, tag, size),
+            format='json',
+        ))
+        for size in (1, len(ingredient_list))
+    ]
+    assert counts[0] == counts[1] <= MAX_CREATE_QUERIES
+
+
+@pytest.mark.django_db
+def test_recipe_update_query_count_is_constant(
+    author_client, make_recipe, ingredient_list, tag
+):
+    recipe = make_recipe()
+    counts = [
+        count_queries(lambda: author_client.patch(
+            f'/api/recipes/{recipe.pk}/',
+            recipe_payload(ingredient_list, tag, size),
+            format='json',
+        ))
+        for size in (1, len(ingredient_list))
+    ]
+    assert counts[0] == counts[1] <= MAX_UPDATE_QUERIES
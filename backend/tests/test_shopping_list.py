@@ -0,0 +1,111 @@
+import os
+
+import pytest
+from django.http import StreamingHttpResponse
+
+from api import renderers
+from recipes.models import Ingredient, ShoppingCard
+
+LARGE_CART_RECIPES = 30
+RECIPE_SIZE = 10
+
+
+@pytest.fixture
+def large_cart(user, make_recipe):
+    """Корзина из многих рецептов: свои ингредиенты и один общий."""
+    shared = Ingredient.objects.create(name='Соль', measurement_unit='шт')
+    products = [
+        Ingredient.objects.create(
+            name=f'Продукт {index:03}', measurement_unit='шт'
+        )
+        for index in range(LARGE_CART_RECIPES * RECIPE_SIZE)
+    ]
+    for index in range(LARGE_CART_RECIPES):
+        recipe = make_recipe(
+            name=f'Рецепт {index}',
+            amount=2,
+            recipe_ingredients=[
+                shared,
+                *products[index * RECIPE_SIZE:(index + 1) * RECIPE_SIZE],
+            ],
+        )
+        ShoppingCard.objects.create(user=user, recipe=recipe)
+    return [
+        'Ваш список покупок:\n',
+        *(f'{product.name}: 2 шт\n' for product in products),
+        f'Соль: {2 * LARGE_CART_RECIPES} шт\n',
+    ]
+
+
+@pytest.mark.django_db
+def test_large_shopping_list_is_streamed(user_client, large_cart):
+    url = '/api/recipes/download_shopping_cart/?format=txt'
+    response = user_client.get(url)
+    assert response.status_code == 200
+    assert isinstance(response, StreamingHttpResponse)
+    assert response['Content-Type'] == 'text/plain; charset=utf-8'
+    assert response['Content-Disposition'] == (
+        'attachment; filename="shoppinglist.txt"'
+    )
+    chunks = list(response.streaming_content)
+    assert len(chunks) == len(large_cart)
+    body = b''.join(chunks).decode()
+    assert body == ''.join(large_cart)
+    cached = user_client.get(url)
+    assert cached.content.decode() == body
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('file_format', ('txt', 'csv', 'pdf'))
+def test_download_errors_are_rendered_as_json(client, file_format):
+    response = client.get(
+        f'/api/recipes/download_shopping_cart/?format={file_format}'
+    )
+    assert response.status_code == 401
+    assert response['Content-Type'] == 'application/json'
+    assert 'detail' in response.json()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query, headers, status_code', (
+    ('?format=docx', {}, 404),
+    ('', {'HTTP_ACCEPT': 'application/xml'}, 406),
+))
+def test_unsupported_download_format_is_rendered_as_json(
+    user_client, query, headers, status_code
+):
+    response = user_client.get(
+        f'/api/recipes/download_shopping_cart/{query}', **headers
+    )
+    assert response.status_code == status_code
+    assert response['Content-Type'] == 'application/json'
+
+
+@pytest.mark.django_db
+def test_pdf_shopping_list_is_built_before_response(
+    settings, user, user_client, make_recipe
+):
+    if not os.path.exists(settings.SHOPPING_LIST_FONT):
+        pytest.skip('нет шрифта для PDF')
+    ShoppingCard.objects.create(user=user, recipe=make_recipe())
+    response = user_client.get(
+        '/api/recipes/download_shopping_cart/?format=pdf'
+    )
+    assert response.status_code == 200
+    assert not isinstance(response, StreamingHttpResponse)
+    assert response['Content-Type'] == 'application/pdf'
+    assert response.content.startswith(b'%PDF')
+
+
+@pytest.mark.django_db
+def test_missing_pdf_font_is_rendered_as_json(monkeypatch, settings, user,
+                                              user_client, make_recipe):
+    monkeypatch.setattr(renderers, 'PDF_FONT_NAME', 'MissingFont')
+    settings.SHOPPING_LIST_FONT = '/nonexistent/font.ttf'
+    ShoppingCard.objects.create(user=user, recipe=make_recipe())
+    response = user_client.get(
+        '/api/recipes/download_shopping_cart/?format=pdf'
+    )
+    assert response.status_code == 503
+    assert response['Content-Type'] == 'application/json'
+    assert 'detail' in response.json()
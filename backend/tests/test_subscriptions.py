@@ -0,0 +1,42 @@
+import pytest
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import FollowSerializer
+from recipes.models import Follow
+
+
+@pytest.fixture
+def followed_author(user, author, make_recipe):
+    Follow.objects.create(user=user, following=author)
+    for index in range(3):
+        make_recipe(name=f'Рецепт {index}')
+    return author
+
+
+@pytest.mark.django_db
+def test_subscriptions_limit_recipes_per_author(user_client, followed_author):
+    response = user_client.get('/api/users/subscriptions/?recipes_limit=1')
+    assert response.status_code == 200
+    [subscription] = response.json()['results']
+    assert len(subscription['recipes']) == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('value', ('abc', '-1'))
+def test_invalid_recipes_limit_is_rejected(user_client, followed_author,
+                                           value):
+    response = user_client.get(
+        f'/api/users/subscriptions/?recipes_limit={value}'
+    )
+    assert response.status_code == 400
+    assert 'recipes_limit' in response.json()
+
+
+@pytest.mark.django_db
+def test_follow_serializer_takes_limit_from_context(followed_author):
+    request = APIRequestFactory().get('/', {'recipes_limit': 'abc'})
+    data = FollowSerializer(
+        followed_author,
+        context={'request': request, 'recipes_limit': 2},
+    ).data
+    assert len(data['recipes']) == 2
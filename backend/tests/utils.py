@@ -0,0 +1,23 @@
+from base64 import b64decode
+
+PNG_BASE64 = (
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAC'
+    'hwGA60e6kgAAAABJRU5ErkJggg=='
+)
+PNG = b64decode(PNG_BASE64)
+PNG_DATA_URL = 'data:image/png;base64,' + PNG_BASE64
+
+
+def recipe_payload(ingredient_list, tag, size=None, amount=10):
+    """Тело запроса на создание рецепта из первых `size` ингредиентов."""
+    return {
+        'ingredients': [
+            {'id': ingredient.pk, 'amount': amount}
+            for ingredient in ingredient_list[:size]
+        ],
+        'tags': [tag.pk],
+        'image': PNG_DATA_URL,
+        'name': 'Рецепт',
+        'text': 'Описание',
+        'cooking_time': 5,
+    }
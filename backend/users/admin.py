@@ -0,0 +1,14 @@
+from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+
+from users.models import CustomUser
+
+
+@admin.register(CustomUser)
+class CustomUserAdmin(UserAdmin):
+    """CustomUser info."""
+
+    list_display = ['id', 'username', 'email', 'first_name', 'last_name',
+                    'recipes_count', 'followers_count']
+    search_fields = ['username', 'email']
+    show_full_result_count = False
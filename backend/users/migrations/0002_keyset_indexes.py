@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-18 05:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['username', 'id'], name='user_username_id_idx'),
+        ),
+    ]
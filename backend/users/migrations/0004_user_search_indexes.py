@@ -0,0 +1,32 @@
+from django.db import migrations
+
+from recipes.operations import VendorRunSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        VendorRunSQL(
+            'postgresql',
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm;',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        VendorRunSQL(
+            'postgresql',
+            'CREATE INDEX IF NOT EXISTS users_customuser_username_trgm '
+            'ON users_customuser '
+            'USING gin ((UPPER(username::text)) gin_trgm_ops);',
+            reverse_sql='DROP INDEX IF EXISTS users_customuser_username_trgm;',
+        ),
+        VendorRunSQL(
+            'postgresql',
+            'CREATE INDEX IF NOT EXISTS users_customuser_email_trgm '
+            'ON users_customuser '
+            'USING gin ((UPPER(email::text)) gin_trgm_ops);',
+            reverse_sql='DROP INDEX IF EXISTS users_customuser_email_trgm;',
+        ),
+    ]
@@ -49,11 +49,25 @@ class CustomUser(AbstractUser):
         choices=ROLE_CHOICES,
         default=USER_ROLE
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Кол-во рецептов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Кол-во подписчиков',
+        default=0
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ['username']
+        indexes = [
+            models.Index(
+                fields=['username', 'id'],
+                name='user_username_id_idx',
+            ),
+        ]
 
     def has_user_role(self) -> bool:
         """Проверка на обычного пользователя."""